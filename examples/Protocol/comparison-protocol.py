@@ -17,139 +17,13 @@ path_src = path_script[0:path_script.find('tolerancetool')]+'tolerancetool/src/'
 sys.path.insert(1, path_src)
 #
 import tol_inv_property as t
+import tol_safety_property as safe
 
 def parallel(*automata: d.DFA) -> d.DFA:
 	"""
 	Computes the parallel composition of 2 (or more) Automata in a BFS manner, and returns the resulting composition as a new Automata.
 	"""
-
-	G1 = automata[0]
-	input_list = automata[1:]
-
-	if any(i.vcount() == 0 for i in automata):
-		# if any inputs are empty, return empty automata
-		return d.DFA()
-
-	for G2 in input_list:
-		G_out = d.NFA()
-		
-		G1_x0 = G1.vs[0]
-		G2_x0 = G2.vs[0]
-		G_out_vertices = [{
-				"name": (G1_x["name"], G2_x["name"]),
-				"marked": G1_x["marked"] and G2_x["marked"],
-			} for G1_x in G1.vs for G2_x in G2.vs]
-		# print(G_out_vertices)
-		G_out_vertices = [
-		    {
-		        "name": (G1_x0["name"], G2_x0["name"]),
-		        "marked": G1_x0["marked"] and G2_x0["marked"],
-		    }
-		]
-		G_out_names = {G_out_vertices[i]["name"]: i for i in range(len(G_out_vertices))}
-		G_out_edges = []  # type: List[Dict[str, Any]]
-
-		# queue = deque([(G1_x, G2_x) for G1_x in G1.vs for G2_x in G2.vs])
-		queue = deque([(G1_x0, G2_x0)])
-		private_G1 = G1.events - G2.events
-		private_G2 = G2.events - G1.events
-
-		while len(queue) > 0:
-			x1, x2 = queue.popleft()
-			active_x1 = {e[1]: e[0] for e in x1["out"]}
-			active_x2 = {e[1]: e[0] for e in x2["out"]}
-			active_both = set(active_x1.keys()) & set(active_x2.keys())
-			cur_name = (x1["name"], x2["name"])
-			src_index = G_out_names[cur_name]
-
-			for e in set(active_x1.keys()) | set(active_x2.keys()):
-				st1 = st2 = []
-				if e in active_both:
-					st1 = [st for (st,ev) in x1['out'] if ev == e]
-					st2 = [st for (st,ev) in x2['out'] if ev == e]
-					for x1_d_id in st1:
-						for x2_d_id in st2:
-							x1_dst = G1.vs[x1_d_id]
-							x2_dst = G2.vs[x2_d_id]
-							dst_name = (x1_dst["name"], x2_dst["name"])
-							dst_index = G_out_names.get(dst_name)
-
-							if dst_index is None:
-								G_out_vertices.append(
-									{
-										"name": dst_name,
-										"marked": x1_dst["marked"] and x2_dst["marked"],
-									}
-								)
-								dst_index = len(G_out_vertices) - 1
-								G_out_names[dst_name] = dst_index
-								queue.append((x1_dst, x2_dst))
-
-							G_out_edges.append({"pair": (src_index, dst_index), "label": e})
-					
-				elif e in private_G1:
-					st1 = [st for (st,ev) in x1['out'] if ev == e]
-					x2_dst = x2
-					for x1_d_id in st1:
-						x1_dst = G1.vs[x1_d_id]
-						dst_name = (x1_dst["name"], x2_dst["name"])
-						dst_index = G_out_names.get(dst_name)
-
-						if dst_index is None:
-							G_out_vertices.append(
-								{
-									"name": dst_name,
-									"marked": x1_dst["marked"] and x2_dst["marked"],
-								}
-							)
-							dst_index = len(G_out_vertices) - 1
-							G_out_names[dst_name] = dst_index
-							queue.append((x1_dst, x2_dst))
-
-						G_out_edges.append({"pair": (src_index, dst_index), "label": e})	
-				elif e in private_G2:
-					x1_dst = x1
-					st2 = [st for (st,ev) in x2['out'] if ev == e]
-					
-					for x2_d_id in st2:
-						x2_dst = G2.vs[x2_d_id]
-						dst_name = (x1_dst["name"], x2_dst["name"])
-						dst_index = G_out_names.get(dst_name)
-
-						if dst_index is None:
-							G_out_vertices.append(
-								{
-									"name": dst_name,
-									"marked": x1_dst["marked"] and x2_dst["marked"],
-								}
-							)
-							dst_index = len(G_out_vertices) - 1
-							G_out_names[dst_name] = dst_index
-							queue.append((x1_dst, x2_dst))
-
-						G_out_edges.append({"pair": (src_index, dst_index), "label": e})
-				else:
-					continue
-				
-
-		G_out.add_vertices(
-			len(G_out_vertices),
-			[v["name"] for v in G_out_vertices],
-			[v["marked"] for v in G_out_vertices],
-		)
-		G_out.add_edges(
-			[e["pair"] for e in G_out_edges],
-			[e["label"] for e in G_out_edges],
-			fill_out=True,
-		)
-		G_out.events = G1.events | G2.events
-		G_out.Euc.update(G1.Euc | G2.Euc)
-		G_out.Euo.update(G1.Euo | G2.Euo)
-
-		G1 = G_out
-
-	return G_out
-
+	return safe.parallel(*automata)
 
 # Env = d.read_fsm(path_script+"/protocol.fsm")
 
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+#Getting absolute path to where script is being executed
+path_script=os.path.dirname(os.path.realpath(__file__))
+#Finding the absolute path to src folder
+path_src = path_script[0:path_script.find('tolerancetool')]+'tolerancetool/src/'
+#Add the path to src folder to PYTHONPATH so that we can import the module in src
+sys.path.insert(1, path_src)
+# Import the tolerancetool functions
+import tol_safety_property as safe
+
+path_to_DESops = path_script[0:path_script.find('tolerancetool')]+'tolerancetool/lib/'
+sys.path.insert(1, path_to_DESops)
+# Import the DESops functions
+import DESops as d
+
+#Benchmark of the power set search of backward_errors against the minimal cut enumeration (minimal_cuts)
+#Both are run on Env_duplicated || Weakest assumption, and must give the same minimal sets of transitions
+def benchmark(name,Env,Ctr,Prop,repeat=5):
+	weak = safe.weakest_assumption(Ctr,Prop)
+	weak = safe.duplicate_events(weak)
+	comp = safe.parallel(Env,weak)
+	safe.Compute_pre_and_uctr(comp)
+	start = time.perf_counter()
+	for i in range(repeat):
+		exhaustive = safe.backward_errors(comp,exhaustive=True)
+	time_exhaustive = (time.perf_counter()-start)/repeat
+	start = time.perf_counter()
+	for i in range(repeat):
+		cuts = list(safe.minimal_cuts(comp))
+	time_cuts = (time.perf_counter()-start)/repeat
+	exhaustive = {frozenset(s) for s in exhaustive}
+	minimal = {s for s in exhaustive if not any(other < s for other in exhaustive)}
+	print("##################################")
+	print(name,": ",comp.vcount()," states, ",comp.ecount()," transitions")
+	print("Power set search: ",len(exhaustive)," sets in ",time_exhaustive,"s")
+	print("Minimal cuts: ",len(cuts)," sets in ",time_cuts,"s")
+	print("Speedup: ",time_exhaustive/time_cuts)
+	print("Same minimal sets: ",minimal == {frozenset(s) for s in cuts})
+
+Env = d.read_fsm(path_script+"/env.fsm")
+Ctr = d.read_fsm(path_script+"/machine.fsm")
+Prop = d.read_fsm(path_script+"/property.fsm")
+benchmark("Safety example",Env,Ctr,Prop)
+
+path_protocol = path_script[0:path_script.find('Safety solutions')]+'Protocol/'
+Env = d.read_fsm(path_protocol+"send_channel_all.fsm")
+Ctr = d.read_fsm(path_protocol+"controller.fsm")
+Prop = d.read_fsm(path_protocol+"io_prop.fsm")
+Ctr.Euo = Ctr.events.difference(Env.Euc)
+benchmark("Protocol example",Env,Ctr,Prop)
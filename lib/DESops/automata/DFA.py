@@ -86,6 +86,7 @@ class DFA(_Automata):
 
         self.events.add(label)
 
+        self.invalidate_index()
         self._graph.add_edge(source, target)
         self.es[self.ecount() - 1].update_attributes({"label": label})
 
@@ -158,6 +159,7 @@ class DFA(_Automata):
         new_labels = list(self._graph.es["label"])
         new_labels.extend(labels)
         self.events.update(labels)
+        self.invalidate_index()
         self._graph.add_edges(pair_list)
         self._graph.es["label"] = new_labels
 
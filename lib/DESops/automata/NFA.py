@@ -43,6 +43,7 @@ class NFA(automata._Automata):
 
             warnings.warn("All initial states deleted.")
             self._graph.delete_vertices([v.index for v in self.vs])
+            self.invalidate_index()
             return
 
         self.generate_out()
@@ -79,6 +80,7 @@ class NFA(automata._Automata):
             stochastic transition), to be stored in the "prob" edge keyword attribute.
         """
 
+        self.invalidate_index()
         self._graph.add_edge(source, target)
         if not isinstance(label, Event):
             # convert labels from str to Event
@@ -140,6 +142,7 @@ class NFA(automata._Automata):
             # no transitions provided
             return
 
+        self.invalidate_index()
         self._graph.add_edges(pair_list)
 
         if labels:
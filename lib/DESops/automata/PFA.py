@@ -60,6 +60,7 @@ class PFA(_Automata):
         prob: (default None) optionally provide probability for this transition (indicating
             stochastic transition), to be stored in the "prob" edge keyword attribute.
         """
+        self.invalidate_index()
         self._graph.add_edge(source, target)
         if not isinstance(label, Event):
             # convert labels from str to Event
@@ -87,6 +88,7 @@ class PFA(_Automata):
         new_labels = list(self._graph.es["label"])
         new_labels.extend(labels)
 
+        self.invalidate_index()
         self._graph.add_edges(pair_list)
 
         self._graph.es["label"] = new_labels
@@ -122,6 +124,7 @@ class PFA(_Automata):
         Generates the "out" attribute for a graph
         >>> automata.vs["out"][v] // -> [(target vert, event transition), (...), ...]
         """
+        self.invalidate_index()
         adj_list = self._graph.get_inclist()
         self.vs["out"] = [
             [
@@ -136,6 +136,8 @@ class _Automata:
 
         # Default case; create Automata from scratch.
         self._graph = ig.Graph(directed=True)
+        # Indices derived from the "out" attribute, see successor_index() and predecessor_index()
+        self._index_cache = dict()
         self.events = set()  # IT SHOULD BE A SET OF EVENTS
 
         if not Euc:
@@ -221,6 +223,7 @@ class _Automata:
                 return
             self._graph.delete_vertices(vs)
             self.generate_out()
+        self.invalidate_index()
 
     def delete_edges(self, es):
         """
@@ -278,6 +281,7 @@ class _Automata:
         return
 
     def add_vertex(self, name=None, marked=None, **kwargs):
+        self.invalidate_index()
         self._graph.add_vertex()
         if name:
             self.vs[self.vcount() - 1].update_attributes({"name": name})
@@ -296,6 +300,7 @@ class _Automata:
         return self.vs[self.vcount() - 1]
 
     def add_vertices(self, number_vertices, names=None, marked=None, **kwargs):
+        self.invalidate_index()
         if names:
             if number_vertices != len(names):
                 raise IncongruencyError(
@@ -371,6 +376,7 @@ class _Automata:
         Generates the "out" attribute for a graph
         >>> automata.vs["out"][v] // -> [(target vert, event transition), (...), ...]
         """
+        self.invalidate_index()
         adj_list = self._graph.get_inclist()
         self.vs["out"] = [
             [
@@ -380,6 +386,60 @@ class _Automata:
             for row in adj_list
         ]
 
+    def invalidate_index(self):
+        """
+        Drops the cached indices derived from the "out" attribute (see successor_index
+        and predecessor_index).
+        Methods that modify the automaton call this automatically; call it after
+        modifying the "out" attribute directly.
+        """
+        self._index_cache.clear()
+
+    def successor_index(self):
+        """
+        Returns the successor index of the automaton, a list indexed by vertex:
+        >>> automata.successor_index()[v][event_label] // -> [target vert, ...]
+        Targets are listed in the order of the "out" attribute.
+
+        The index is built once from the "out" attribute and cached on the automaton
+        until the automaton is modified.
+        """
+        index = self._index_cache.get("successor")
+        if index is None:
+            index = []
+            for out in self.vs["out"]:
+                succ = dict()
+                for t in out:
+                    succ.setdefault(t[1].label, []).append(t[0])
+                index.append(succ)
+            self._index_cache["successor"] = index
+        return index
+
+    def predecessor_index(self, events=None):
+        """
+        Returns the predecessor index of the automaton, a list indexed by vertex:
+        >>> automata.predecessor_index()[v] // -> [(source vert, event), ...]
+        >>> automata.predecessor_index(automata.Euc)[v] // only uncontrollable transitions
+        There is one pair per transition, sources are listed in increasing order.
+
+        The index is built in one pass over the "out" attribute and cached on the
+        automaton (one index per event subset) until the automaton is modified.
+
+        Parameters:
+        events: optional set of events; if given, only transitions labelled by
+            an event of this set are listed.
+        """
+        key = ("predecessor", None if events is None else frozenset(events))
+        index = self._index_cache.get(key)
+        if index is None:
+            index = [[] for _ in range(self.vcount())]
+            for source, out in enumerate(self.vs["out"]):
+                for t in out:
+                    if events is None or t[1] in events:
+                        index[t[0]].append((source, t[1]))
+            self._index_cache[key] = index
+        return index
+
     def summary(self, use_state_names=False, lines=None):
         """
         Convenience method: prints a cleaned up adjacency list
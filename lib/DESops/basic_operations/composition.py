@@ -1,6 +1,7 @@
 """
 Funcions relevant to the composition operations.
 """
+from array import array
 from collections import deque
 from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
@@ -238,89 +239,191 @@ def parallel_bfs(*automata: DFA):
     )
 
 
+def event_ids(*automata: _Automata) -> Tuple[List[Event], Dict[Event, int]]:
+    """
+    Numbers the events of the given automata (their event sets and the labels of their transitions),
+    in increasing order of label.
+
+    Returns: (events, ids) where events[i] is the event with id i and ids[event] == i
+    """
+    found = dict()
+    for G in automata:
+        for e in G.events:
+            found.setdefault(e, e)
+        for out in G.vs["out"]:
+            for t in out:
+                found.setdefault(t[1], t[1])
+    events = sorted(found.values(), key=lambda e: str(e.label))
+    return events, {e: i for i, e in enumerate(events)}
+
+
+def transition_tables(
+    outs, ids: Dict[Event, int], deterministic: bool = False
+) -> List[Dict[int, Tuple[int, ...]]]:
+    """
+    Returns the transitions of an automaton over event ids, a list indexed by state:
+    >>> transition_tables(G.vs["out"], ids)[v][event_id] // -> (target vert, ...)
+
+    Parameters:
+    outs: iterable with the "out" list of each state
+    ids: event ids, see event_ids()
+    deterministic: if True, only the last target of each event is kept (a state of
+        a DFA has at most one transition per event)
+    """
+    tables = []
+    for out in outs:
+        succ = dict()
+        for t in out:
+            if deterministic:
+                succ[ids[t[1]]] = (t[0],)
+            else:
+                succ[ids[t[1]]] = succ.get(ids[t[1]], ()) + (t[0],)
+        tables.append(succ)
+    return tables
+
+
+def sync_table(alphabets: List[Set[int]]) -> Dict[int, Tuple[int, ...]]:
+    """
+    Returns the event-sync table of a composition: for each event id, the components
+    (indices in alphabets) whose alphabet contains it, in increasing order.
+    """
+    sync = dict()
+    for i, alphabet in enumerate(alphabets):
+        for e in alphabet:
+            sync[e] = sync.get(e, ()) + (i,)
+    return sync
+
+
+def parallel_kernel(
+    tables: List[List[Dict[int, Tuple[int, ...]]]],
+    alphabets: List[Set[int]],
+    absorbing: Optional[List[Optional[Set[int]]]] = None,
+    init: Optional[List[Tuple[int, ...]]] = None,
+):
+    """
+    Parallel composition of N automata over integer states and event ids, explored in
+    a single BFS from the tuple of initial states (0, ..., 0).
+    An event moves every component whose alphabet contains it (all of them must enable it)
+    and leaves the others unchanged, see sync_table(). Only the tuples reachable in the
+    N-ary composition are built: no intermediate composition of a subset of the components.
+
+    Returns: (states, sources, targets, labels)
+        states: list of tuples of component states; states[i] is product state i
+        sources, targets, labels: flat arrays with one entry per transition (product states and event ids)
+
+    Parameters:
+    tables: transition tables of the components, see transition_tables()
+    alphabets: event ids of the components
+    absorbing: optional list with a set of states (or None) per component. If given, the
+        product state after the initial ones is a single absorbing state (states[i] is None),
+        which is not explored: a transition to a tuple where a component is in its absorbing
+        set goes to this state
+    init: optional list of tuples the BFS starts from, they are the first product states
+        (default [(0, ..., 0)])
+    """
+    sync = sync_table(alphabets)
+    # leads[i][xi]: moves led by component i in state xi, as (event, targets, other components)
+    leads = [dict() for _ in tables]
+
+    def led(i, xi):
+        moves = []
+        for e, dst in tables[i][xi].items():
+            comps = sync.get(e, (i,))
+            if comps[0] == i:
+                moves.append((e, dst, comps[1:]))
+            elif i not in comps:
+                # an event outside the alphabet of the component moves it alone
+                moves.append((e, dst, ()))
+        leads[i][xi] = moves
+        return moves
+
+    states = list(init) if init is not None else [(0,) * len(tables)]
+    index = {x: i for i, x in enumerate(states)}
+    queue = deque(range(len(states)))
+    checks = []
+    if absorbing is not None:
+        checks = [(j, a) for j, a in enumerate(absorbing) if a]
+        absorbing_state = len(states)
+        states.append(None)
+    sources = array("q")
+    targets = array("q")
+    labels = array("q")
+    while queue:
+        src = queue.popleft()
+        x = states[src]
+        for i, xi in enumerate(x):
+            moves = leads[i].get(xi)
+            if moves is None:
+                moves = led(i, xi)
+            for e, dst, others in moves:
+                succ = [x[:i] + (t,) + x[i + 1 :] for t in dst]
+                for j in others:
+                    dst_j = tables[j][x[j]].get(e)
+                    if not dst_j:
+                        succ = ()
+                        break
+                    succ = [y[:j] + (t,) + y[j + 1 :] for y in succ for t in dst_j]
+                for y in succ:
+                    for j, a in checks:
+                        if y[j] in a:
+                            dst_y = absorbing_state
+                            break
+                    else:
+                        dst_y = index.get(y)
+                        if dst_y is None:
+                            dst_y = index[y] = len(states)
+                            states.append(y)
+                            queue.append(dst_y)
+                    sources.append(src)
+                    targets.append(dst_y)
+                    labels.append(e)
+    return states, sources, targets, labels
+
+
+def nested_names(automata, states: List[Tuple[int, ...]]) -> List[Any]:
+    """
+    Returns the names of the product states, nested as the names of a pairwise composition:
+    ((name_1, name_2), name_3), ...
+    """
+    names = [G.vs["name"] for G in automata]
+    result = []
+    for x in states:
+        name = names[0][x[0]]
+        for j in range(1, len(x)):
+            name = (name, names[j][x[j]])
+        result.append(name)
+    return result
+
+
 def parallel(*automata: DFA) -> DFA:
     """
     Computes the parallel composition of 2 (or more) Automata in a BFS manner, and returns the resulting composition as a new Automata.
+    The automata are composed together in a single run of parallel_kernel.
     """
     if len(automata) < 2:
         raise MissingAttributeError("More than one automaton are needed.")
 
-    G1 = automata[0]
-    input_list = automata[1:]
-
     if any(i.vcount() == 0 for i in automata):
         # if any inputs are empty, return empty automata
         return DFA()
 
-    for G2 in input_list:
-        G_out = DFA()
-
-        G1_x0 = G1.vs[0]
-        G2_x0 = G2.vs[0]
-        G_out_vertices = [
-            {
-                "name": (G1_x0["name"], G2_x0["name"]),
-                "marked": G1_x0["marked"] and G2_x0["marked"],
-            }
-        ]
-        G_out_names = {G_out_vertices[0]["name"]: 0}
-        G_out_edges = []  # type: List[Dict[str, Any]]
-
-        queue = deque([(G1_x0, G2_x0)])
-
-        private_G1 = G1.events - G2.events
-        private_G2 = G2.events - G1.events
-
-        while len(queue) > 0:
-            x1, x2 = queue.popleft()
-            active_x1 = {e[1]: e[0] for e in x1["out"]}
-            active_x2 = {e[1]: e[0] for e in x2["out"]}
-            active_both = set(active_x1.keys()) & set(active_x2.keys())
-            cur_name = (x1["name"], x2["name"])
-            src_index = G_out_names[cur_name]
-
-            for e in set(active_x1.keys()) | set(active_x2.keys()):
-                if e in active_both:
-                    x1_dst = G1.vs[active_x1[e]]
-                    x2_dst = G2.vs[active_x2[e]]
-                elif e in private_G1:
-                    x1_dst = G1.vs[active_x1[e]]
-                    x2_dst = x2
-                elif e in private_G2:
-                    x1_dst = x1
-                    x2_dst = G2.vs[active_x2[e]]
-                else:
-                    continue
-
-                dst_name = (x1_dst["name"], x2_dst["name"])
-                dst_index = G_out_names.get(dst_name)
-
-                if dst_index is None:
-                    G_out_vertices.append(
-                        {
-                            "name": dst_name,
-                            "marked": x1_dst["marked"] and x2_dst["marked"],
-                        }
-                    )
-                    dst_index = len(G_out_vertices) - 1
-                    G_out_names[dst_name] = dst_index
-                    queue.append((x1_dst, x2_dst))
-
-                G_out_edges.append({"pair": (src_index, dst_index), "label": e})
-
-        G_out.add_vertices(
-            len(G_out_vertices),
-            [v["name"] for v in G_out_vertices],
-            [v["marked"] for v in G_out_vertices],
-        )
-        G_out.add_edges(
-            [e["pair"] for e in G_out_edges], [e["label"] for e in G_out_edges]
-        )
-        G_out.events = G1.events | G2.events
-        G_out.Euc.update(G1.Euc | G2.Euc)
-        G_out.Euo.update(G1.Euo | G2.Euo)
-
-        G1 = G_out
+    G_out = DFA()
+    events, ids = event_ids(*automata)
+    states, sources, targets, labels = parallel_kernel(
+        [transition_tables(G.vs["out"], ids, deterministic=True) for G in automata],
+        [{ids[e] for e in G.events} for G in automata],
+    )
+    marked = [G.vs["marked"] for G in automata]
+    G_out.add_vertices(
+        len(states),
+        nested_names(automata, states),
+        [all(marked[j][xj] for j, xj in enumerate(x)) for x in states],
+    )
+    G_out.add_edges(list(zip(sources, targets)), [events[e] for e in labels])
+    for G in automata:
+        G_out.events |= G.events
+        G_out.Euc.update(G.Euc)
+        G_out.Euo.update(G.Euo)
 
     return G_out
 
@@ -328,6 +431,10 @@ def parallel(*automata: DFA) -> DFA:
 def parallel_linear(*automata: Automata_t) -> Automata_t:
     """
     Computes the parallel composition of 2 (or more) Automata, and returns the resulting composition as a new Automata.
+    The alphabet of each automaton is the set of labels of its transitions.
+    The result is an NFA (compositions of NFA are not deterministic).
+    The automata are composed pairwise (the alphabet of an intermediate composition
+    depends on its transitions), each composition of two automata runs parallel_kernel.
     """
     if len(automata) < 2:
         raise MissingAttributeError("More than one automaton are needed.")
@@ -338,74 +445,29 @@ def parallel_linear(*automata: Automata_t) -> Automata_t:
     for G2 in tqdm(
         input_list, desc="Parallel Composition", disable=SHOW_PROGRESS is False
     ):
-        G_out = _Automata()
-        E1 = set(G1.es["label"])
-        E2 = set(G2.es["label"])
-
-        num_G2_states = len(G2.vs)
-        G_out_vertices = [
-            {
-                "index": i * num_G2_states + j,
-                "name": (x1["name"], x2["name"]),
-                "marked": x1["marked"] is True and x2["marked"] is True,
-                "indexes": (x1.index, x2.index),
-            }
-            for i, x1 in enumerate(G1.vs)
-            for j, x2 in enumerate(G2.vs)
-        ]
+        G_out = NFA()
+        if G1.vcount() == 0 or G2.vcount() == 0:
+            G1 = G_out
+            continue
+        events, ids = event_ids(G1, G2)
+        states, sources, targets, labels = parallel_kernel(
+            [transition_tables(G1.vs["out"], ids), transition_tables(G2.vs["out"], ids)],
+            [{ids[e] for e in G1.es["label"]}, {ids[e] for e in G2.es["label"]}],
+        )
+        names1, names2 = G1.vs["name"], G2.vs["name"]
+        marked1, marked2 = G1.vs["marked"], G2.vs["marked"]
         G_out.add_vertices(
-            len(G_out_vertices),
-            names=[v["name"] for v in G_out_vertices],
-            marked=[v["marked"] for v in G_out_vertices],
-            indexes=[v["indexes"] for v in G_out_vertices],
+            len(states),
+            names=[(names1[x1], names2[x2]) for x1, x2 in states],
+            marked=[marked1[x1] is True and marked2[x2] is True for x1, x2 in states],
         )
-        G1_vertices = [
-            {
-                "index": x.index,
-                "name": x["name"],
-                "marked": x["marked"],
-                "out": x["out"],
-            }
-            for x in G1.vs
-        ]
-        G2_vertices = [
-            {
-                "index": x.index,
-                "name": x["name"],
-                "marked": x["marked"],
-                "out": x["out"],
-            }
-            for x in G2.vs
-        ]
-        indexes_dict = {
-            v: i for i, v in enumerate([v["indexes"] for v in G_out_vertices])
-        }
-
-        edges = []
-        for x in tqdm(
-            G_out_vertices,
-            desc="Processing states",
-            unit="states",
-            leave=False,
-            disable=SHOW_PROGRESS is False,
-        ):
-            new_edges = __find_parallel_edges_at_states(
-                x, G1_vertices, G2_vertices, E1, E2, indexes_dict
-            )
-            if new_edges is not None:
-                edges.extend(new_edges)
-
         G_out.add_edges(
-            [edge["pair"] for edge in edges],
-            [edge["label"] for edge in edges],
+            list(zip(sources, targets)),
+            [events[e] for e in labels],
             fill_out=True,
         )
-
-        bad_states = find_inacc(G_out)
-        G_out.delete_vertices(list(bad_states))
         G1 = G_out
 
-    del G_out.vs["indexes"]
     G_out.Euc.update(
         pydash.reduce_(automata, lambda euc, g: euc | g.Euc, set())
         & set(G_out.es["label"])
@@ -418,66 +480,6 @@ def parallel_linear(*automata: Automata_t) -> Automata_t:
     return G_out
 
 
-def __find_parallel_edges_at_states(
-    x: dict,
-    G1_vertices: List[dict],
-    G2_vertices: List[dict],
-    E1: EventSet,
-    E2: EventSet,
-    G_out_index_dict: Dict[tuple, int],
-) -> Optional[List[dict]]:
-    x1 = G1_vertices[x["indexes"][0]]
-    x2 = G2_vertices[x["indexes"][1]]
-    active_x1 = {out[1] for out in x1["out"]}
-    active_x2 = {out[1] for out in x2["out"]}
-    active_both = active_x1 & active_x2
-    x1_ex = active_x1 - E2
-    x2_ex = active_x2 - E1
-    if not active_both and not x1_ex and not x2_ex:
-        None
-
-    edges = []
-    for e in active_both:
-        x1_outs = [G1_vertices[out[0]] for out in x1["out"] if out[1] == e]
-        x2_outs = [G2_vertices[out[0]] for out in x2["out"] if out[1] == e]
-        new_edges = [
-            {
-                "pair": (
-                    x["index"],
-                    G_out_index_dict[(x1_dst["index"], x2_dst["index"])],
-                ),
-                "label": e,
-            }
-            for x1_dst in x1_outs
-            for x2_dst in x2_outs
-        ]
-        edges.extend(new_edges)
-
-    for e in x1_ex:
-        x1_outs = [G1_vertices[out[0]] for out in x1["out"] if out[1] == e]
-        new_edges = [
-            {
-                "pair": (x["index"], G_out_index_dict[(x1_dst["index"], x2["index"])]),
-                "label": e,
-            }
-            for x1_dst in x1_outs
-        ]
-        edges.extend(new_edges)
-
-    for e in x2_ex:
-        x2_outs = [G2_vertices[out[0]] for out in x2["out"] if out[1] == e]
-        new_edges = [
-            {
-                "pair": (x["index"], G_out_index_dict[(x1["index"], x2_dst["index"])]),
-                "label": e,
-            }
-            for x2_dst in x2_outs
-        ]
-        edges.extend(new_edges)
-
-    return edges
-
-
 def observer(G: Automata_t) -> Automata_t:
     """
     Compute the observer automata of the input G
@@ -0,0 +1,127 @@
+class Antichain:
+	"""
+	Family of sets that are minimal with respect to the subset ordering.
+
+	Sets are encoded as integer bitmasks over their elements (each new element gets the next bit)
+	and grouped by cardinality. Adding a set that contains a set of the family does nothing,
+	and adding a set removes the sets of the family that contain it. The family stays minimal
+	after every insertion, so it can be maintained while the sets are generated.
+
+	>>> chain = Antichain([{1,2,3},{2,3}])
+	>>> chain.add({1,2})
+	True
+	>>> chain.add({1,2,4})
+	False
+	>>> chain.sets()
+	[{2, 3}, {1, 2}]
+
+	Parameters:
+	sets: optional iterable of sets to add
+	"""
+	def __init__(self,sets=()):
+		self._bit = dict()
+		self._elements = []
+		# mask: None, in insertion order
+		self._members = dict()
+		# cardinality: set of masks
+		self._by_size = dict()
+		self.rejected = 0
+		self.evicted = 0
+		for s in sets:
+			self.add(s)
+
+	def bit(self,x):
+		"""
+		Returns the bitmask of the set {x}
+		"""
+		i = self._bit.get(x)
+		if i is None:
+			i = self._bit[x] = len(self._elements)
+			self._elements.append(x)
+		return 1 << i
+
+	def encode(self,s):
+		"""
+		Returns the bitmask of the set s
+		"""
+		mask = 0
+		for x in s:
+			mask |= self.bit(x)
+		return mask
+
+	def decode(self,mask):
+		"""
+		Returns the set encoded by mask
+		"""
+		elements = self._elements
+		return {elements[i] for i in range(mask.bit_length()) if mask >> i & 1}
+
+	def has_subset_mask(self,mask):
+		"""
+		Returns True if a set of the family is a subset of (or equal to) the set encoded by mask
+		"""
+		size = bin(mask).count("1")
+		for (k,masks) in self._by_size.items():
+			if k <= size:
+				for m in masks:
+					if mask & m == m:
+						return True
+		return False
+
+	def has_subset(self,s):
+		"""
+		Returns True if a set of the family is a subset of (or equal to) s
+		"""
+		return self.has_subset_mask(self.encode(s))
+
+	def add_mask(self,mask):
+		"""
+		Adds the set encoded by mask. It returns False if the set contains a set of the family (it is not added)
+		"""
+		if self.has_subset_mask(mask):
+			self.rejected += 1
+			return False
+		size = bin(mask).count("1")
+		for (k,masks) in self._by_size.items():
+			if k > size:
+				subsumed = [m for m in masks if m & mask == mask]
+				for m in subsumed:
+					masks.discard(m)
+					del self._members[m]
+				self.evicted += len(subsumed)
+		self._by_size.setdefault(size,set()).add(mask)
+		self._members[mask] = None
+		return True
+
+	def add(self,s):
+		"""
+		Adds the set s. It returns False if s contains a set of the family (it is not added)
+		"""
+		return self.add_mask(self.encode(s))
+
+	def masks(self):
+		"""
+		Returns the bitmasks of the family in insertion order
+		"""
+		return list(self._members)
+
+	def sets(self):
+		"""
+		Returns the sets of the family in insertion order
+		"""
+		return [self.decode(m) for m in self._members]
+
+	def __len__(self):
+		return len(self._members)
+
+	def __iter__(self):
+		for m in list(self._members):
+			yield self.decode(m)
+
+	def __contains__(self,s):
+		if any(x not in self._bit for x in s):
+			return False
+		return self.encode(s) in self._members
+
+	def __repr__(self):
+		return "Antichain({} sets)".format(len(self._members))
@@ -0,0 +1,379 @@
+import os
+import sys
+path_script=os.path.dirname(os.path.realpath(__file__))
+path_to_DESops = path_script[0:path_script.find('tolerancetool/src')]+'tolerancetool/lib/'
+
+sys.path.insert(1, path_to_DESops)
+#
+import DESops as d
+import multiprocessing
+from multiprocessing import shared_memory
+from tol_profile import phase
+from tol_invariant import Compile_invariant
+
+try:
+	import numpy as np
+except ImportError:
+	raise d.error.DependencyNotInstalledError("NumPy library not found")
+
+
+def _event_key(ev):
+	return str(ev.label)
+
+
+class BitsetLTS:
+	"""
+	Bitset view of an LTS T: one boolean adjacency matrix per event, stored as numpy packed bits.
+	Row src of the matrix of event e has bit tgt set iff (src,e,tgt) is a transition of T.
+
+	Parameters:
+	T: LTS (DFA or NFA)
+	"""
+	def __init__(self,T):
+		self.n = len(T.vs)
+		self.names = list(T.vs['name'])
+		self.events = sorted(T.events,key=_event_key)
+		self.event_id = {ev: i for i,ev in enumerate(self.events)}
+		self.width = (self.n+7)//8
+		trans = [(self.event_id[ev],st,tgt) for st in range(self.n) for (tgt,ev) in T.vs[st]['out']]
+		(ev,src,tgt) = np.array(trans,dtype=np.int64).reshape(-1,3).T
+		self.adj = np.zeros((len(self.events),self.n,self.width),dtype=np.uint8)
+		np.bitwise_or.at(self.adj,(ev,src,tgt>>3),(128>>(tgt&7)).astype(np.uint8))
+
+	def pack(self,m):
+		"""
+		Returns the boolean vector m as a packed row
+		"""
+		return np.packbits(m)
+
+	def controller_mask(self,f):
+		"""
+		Returns a boolean matrix (events x states) with the events enabled by controller f in each state
+		States not in f enable no event
+		"""
+		labels = {ev.label: i for i,ev in enumerate(self.events)}
+		ctrl = np.zeros((len(self.events),self.n),dtype=bool)
+		for st,name in enumerate(self.names):
+			if name in f.keys():
+				for ev in f[name]:
+					if ev in labels:
+						ctrl[labels[ev],st] = True
+		return ctrl
+
+	def extend_qinv(self,Qinv):
+		"""
+		Returns the packed adjacency matrices of Extend_Env_Qinv(T,Qinv): every event leads
+		from every state in Qinv to every state in Qinv
+
+		Parameters:
+		Qinv: boolean vector of invariant states
+		"""
+		ext = self.adj.copy()
+		ext |= np.where(Qinv[:,None],self.pack(Qinv)[None,:],0).astype(np.uint8)[None,:,:]
+		return ext
+
+	def controlled_reach(self,ctrl,Qinv):
+		"""
+		Returns the boolean vector of states reachable in Control(Extend_Env_Qinv(T,Qinv),f)
+		and the boolean matrix (events x states) of events used by f in each state
+
+		Parameters:
+		ctrl: boolean matrix returned by controller_mask
+		Qinv: boolean vector of invariant states
+		"""
+		return _reach(self.extend_qinv(Qinv),ctrl)
+
+	def delta_masks(self,f,Qinv):
+		"""
+		Yields (event, packed matrix) where the matrix holds the transitions of Delta labelled with event
+
+		Parameters:
+		f: controller (dict state name: tuple of actions)
+		Qinv: boolean vector of invariant states
+		"""
+		(reach,used) = self.controlled_reach(self.controller_mask(f),Qinv)
+		for e,m in enumerate(_delta_masks(self.adj,Qinv,reach,used)):
+			yield (self.events[e],m)
+
+	def delta_edges(self,f,Qinv):
+		"""
+		Yields (event, sources, targets) with the transitions of Delta as index arrays
+		"""
+		for (ev,m) in self.delta_masks(f,Qinv):
+			(src,tgt) = np.nonzero(np.unpackbits(m,axis=1,count=self.n))
+			yield (ev,src,tgt)
+
+
+def _sorted_unique(keys):
+	# np.unique without hashing: sort, then drop repeated keys
+	keys = np.sort(keys)
+	if len(keys):
+		keys = keys[np.concatenate(([True],keys[1:]!=keys[:-1]))]
+	return keys
+
+
+class DeltaKeys:
+	"""
+	Delta as a sorted array of unique packed int64 keys src*|E|*|Q| + ev*|Q| + tgt, where src and tgt
+	are state indices of T and ev is the position of the event in the events of T sorted by label.
+	Set operations are vectorized; transitions are decoded to (source name, Event, target name) on demand.
+	Two DeltaKeys can be combined only if they refer to the same states and events.
+
+	Parameters:
+	names: state names of T, by index
+	events: events of T sorted by label
+	keys: array of keys (sorted and made unique here)
+	"""
+	def __init__(self,names,events,keys):
+		self.names = names
+		self.events = events
+		self.n = len(names)
+		self.keys = _sorted_unique(np.asarray(keys,dtype=np.int64))
+		self._name2id = None
+
+	@classmethod
+	def from_triples(cls,T,triples):
+		"""
+		Builds DeltaKeys from (source name, event, target name) triples of LTS T; event is an Event or a label
+		"""
+		names = list(T.vs['name'])
+		events = sorted(T.events,key=_event_key)
+		name2id = {name: i for i,name in enumerate(names)}
+		label2id = {ev.label: i for i,ev in enumerate(events)}
+		codes = [(name2id[src],label2id[ev.label if isinstance(ev,d.Event) else ev],name2id[tgt]) for (src,ev,tgt) in triples]
+		(src,ev,tgt) = np.array(codes,dtype=np.int64).reshape(-1,3).T
+		return cls(names,events,(src*len(events)+ev)*len(names)+tgt)
+
+	@classmethod
+	def from_rectangles(cls,names,events,rectangles,removed):
+		"""
+		Builds DeltaKeys from disjoint rectangles (sources, events, targets) minus the transitions in removed
+		(see tol_delta.DeltaSet)
+		"""
+		n = len(names)
+		event_id = {ev: i for i,ev in enumerate(events)}
+		parts = []
+		for (src,evs,tgt) in rectangles:
+			src = np.array(sorted(src),dtype=np.int64)
+			evs = np.array(sorted(event_id[ev] for ev in evs),dtype=np.int64)
+			tgt = np.array(sorted(tgt),dtype=np.int64)
+			parts.append(((src[:,None,None]*len(events)+evs[None,:,None])*n+tgt[None,None,:]).ravel())
+		keys = np.concatenate(parts) if parts else np.zeros(0,dtype=np.int64)
+		codes = np.array([(st,event_id[ev],t) for (st,ev,t) in removed],dtype=np.int64).reshape(-1,3).T
+		keys = keys[~np.isin(keys,(codes[0]*len(events)+codes[1])*n+codes[2])]
+		return cls(names,events,keys)
+
+	def _check(self,other):
+		if self.n != other.n or self.events != other.events:
+			raise d.error.IncongruencyError("DeltaKeys refer to different states or events")
+
+	def _new(self,keys):
+		# keys are already sorted and unique
+		D = DeltaKeys.__new__(DeltaKeys)
+		D.names = self.names
+		D.events = self.events
+		D.n = self.n
+		D.keys = keys
+		D._name2id = self._name2id
+		return D
+
+	def union(self,other):
+		self._check(other)
+		return self._new(_sorted_unique(np.concatenate((self.keys,other.keys))))
+
+	def intersection(self,other):
+		self._check(other)
+		return self._new(np.intersect1d(self.keys,other.keys,assume_unique=True))
+
+	def difference(self,other):
+		self._check(other)
+		return self._new(np.setdiff1d(self.keys,other.keys,assume_unique=True))
+
+	def symmetric_difference(self,other):
+		self._check(other)
+		return self._new(np.setxor1d(self.keys,other.keys,assume_unique=True))
+
+	def issubset(self,other):
+		self._check(other)
+		if len(self.keys) > len(other.keys):
+			return False
+		return bool(np.isin(self.keys,other.keys,assume_unique=True).all())
+
+	def issuperset(self,other):
+		return other.issubset(self)
+
+	__or__ = union
+	__and__ = intersection
+	__sub__ = difference
+	__xor__ = symmetric_difference
+	__le__ = issubset
+	__ge__ = issuperset
+
+	def __eq__(self,other):
+		if not isinstance(other,DeltaKeys):
+			return NotImplemented
+		self._check(other)
+		return np.array_equal(self.keys,other.keys)
+
+	def __len__(self):
+		return len(self.keys)
+
+	def encode(self,src,ev,tgt):
+		"""
+		Returns the key of the transition given by state indices and an Event or label
+		"""
+		label = ev.label if isinstance(ev,d.Event) else ev
+		for e,event in enumerate(self.events):
+			if event.label == label:
+				return (src*len(self.events)+e)*self.n+tgt
+		return -1
+
+	def contains_index(self,src,ev,tgt):
+		key = self.encode(src,ev,tgt)
+		i = np.searchsorted(self.keys,key)
+		return i < len(self.keys) and self.keys[i] == key
+
+	def __contains__(self,trans):
+		(src,ev,tgt) = trans
+		if self._name2id is None:
+			self._name2id = {name: i for i,name in enumerate(self.names)}
+		if src not in self._name2id or tgt not in self._name2id:
+			return False
+		return self.contains_index(self._name2id[src],ev,self._name2id[tgt])
+
+	def decode(self):
+		"""
+		Returns the index arrays (sources, event positions, targets) of the keys
+		"""
+		if not len(self.keys):
+			return (self.keys,self.keys,self.keys)
+		(rest,tgt) = np.divmod(self.keys,self.n)
+		(src,ev) = np.divmod(rest,len(self.events))
+		return (src,ev,tgt)
+
+	def __iter__(self):
+		(src,ev,tgt) = self.decode()
+		names = self.names
+		events = self.events
+		for (s,e,t) in zip(src.tolist(),ev.tolist(),tgt.tolist()):
+			yield (names[s],events[e],names[t])
+
+	def __repr__(self):
+		return "DeltaKeys({} transitions)".format(len(self))
+
+
+def _reach(ext,ctrl):
+	# Reachability from state 0 in the controlled LTS, given its packed adjacency matrices ext
+	(n_events,n,width) = ext.shape
+	used = ctrl & ext.any(axis=2)
+	reach = np.zeros(n,dtype=bool)
+	if not n:
+		return (reach,used)
+	reach[0] = True
+	frontier = reach.copy()
+	while frontier.any():
+		post = np.zeros(width,dtype=np.uint8)
+		for e in range(n_events):
+			rows = frontier & used[e]
+			if rows.any():
+				post |= np.bitwise_or.reduce(ext[e][rows],axis=0)
+		post = np.unpackbits(post,count=n).astype(bool)
+		frontier = post & ~reach
+		reach |= post
+	return (reach,used)
+
+def _delta_masks(adj,Qinv,reach,used):
+	# Yields, for every event, the packed matrix of the transitions of Delta
+	Unsafe = ~Qinv
+	col_qinv = np.packbits(Qinv)
+	col_unsafe = np.packbits(Unsafe)
+	col_all = np.packbits(np.ones(len(Qinv),dtype=bool))
+	full = np.uint8(255)
+	for e in range(adj.shape[0]):
+		# Qinv x Act x Qinv
+		m = np.where(Qinv[:,None],col_qinv[None,:],0).astype(np.uint8)
+		# Unsafe x Act x Q
+		m |= np.where(Unsafe[:,None],col_all[None,:],0).astype(np.uint8)
+		# States in Qinv towards Unsafe with events not used by f (every event if not reachable)
+		not_used = Qinv & ~(reach & used[e])
+		m |= np.where(not_used[:,None],col_unsafe[None,:],0).astype(np.uint8)
+		m &= ~adj[e] & full
+		yield m
+
+def _evaluate(adj,ext,Qinv,ctrl):
+	# Size of Delta, reachable states and used events for one controller mask
+	(reach,used) = _reach(ext,ctrl)
+	size = sum(int(np.unpackbits(m).sum()) for m in _delta_masks(adj,Qinv,reach,used))
+	return (size,reach,used)
+
+# Arrays shared with the worker processes of Compute_tolerance_levels_bits
+_shared = dict()
+
+def _attach(name,shape,Qinv):
+	shm = shared_memory.SharedMemory(name=name)
+	arrays = np.ndarray(shape,dtype=np.uint8,buffer=shm.buf)
+	_shared['shm'] = shm
+	_shared['adj'] = arrays[0]
+	_shared['ext'] = arrays[1]
+	_shared['Qinv'] = Qinv
+
+def _evaluate_shared(ctrl):
+	return _evaluate(_shared['adj'],_shared['ext'],_shared['Qinv'],ctrl)
+
+#Function to compute the tolerance level of many controllers with the bitset engine
+#The adjacency of T and of Extend_Env_Qinv(T,Qinv) are computed once and placed in shared memory, read by a pool of workers processes
+#workers is the number of processes (None uses every CPU, 1 evaluates in this process)
+#It returns one (size of Delta, used) per controller, in order, where used maps each reachable state index to the set of events used by the controller
+def Compute_tolerance_levels_bits(T,controllers,Qinv_name,workers=None):
+	B = BitsetLTS(T)
+	Qinv = np.frombuffer(Compile_invariant(T,Qinv_name).mask,dtype=np.uint8).astype(bool)
+	ext = B.extend_qinv(Qinv)
+	ctrls = [B.controller_mask(f) for f in controllers]
+	if workers == 1:
+		results = [_evaluate(B.adj,ext,Qinv,ctrl) for ctrl in ctrls]
+	else:
+		shape = (2,)+B.adj.shape
+		shm = shared_memory.SharedMemory(create=True,size=max(1,2*B.adj.nbytes))
+		try:
+			arrays = np.ndarray(shape,dtype=np.uint8,buffer=shm.buf)
+			arrays[0] = B.adj
+			arrays[1] = ext
+			with multiprocessing.Pool(workers,initializer=_attach,initargs=(shm.name,shape,Qinv)) as pool:
+				results = pool.map(_evaluate_shared,ctrls)
+			del arrays
+		finally:
+			shm.close()
+			shm.unlink()
+	levels = []
+	for (size,reach,used) in results:
+		used = {int(st): {B.events[e] for e in np.nonzero(used[:,st])[0]} for st in np.nonzero(reach)[0]}
+		levels.append((size,used))
+	return levels
+
+#Function to compute tolerance level of controller f with the bitset engine
+#It has the same parameters and the same (Delta,Tdelta) result as tol_inv_property.Compute_tolerance_level
+#Tdelta holds each transition once: the transitions of T and the transitions in Delta
+#profile is optional: a tol_profile.Profile that records time, memory and counts of each phase
+def Compute_tolerance_level_bits(T,f,Qinv_name,profile=None):
+	with phase(profile,"BitsetLTS",states=len(T.vs)) as counts:
+		B = BitsetLTS(T)
+		Qinv = np.frombuffer(Compile_invariant(T,Qinv_name).mask,dtype=np.uint8).astype(bool)
+		counts["events"] = len(B.events)
+		counts["bytes"] = B.adj.nbytes
+	pairs = []
+	labels = []
+	Delta = []
+	names = B.names
+	with phase(profile,"Delta") as counts:
+		for (ev,src,tgt) in B.delta_edges(f,Qinv):
+			src = src.tolist()
+			tgt = tgt.tolist()
+			pairs.extend(zip(src,tgt))
+			labels.extend([ev]*len(src))
+			Delta.extend((names[s],ev,names[t]) for (s,t) in zip(src,tgt))
+		counts["transitions"] = len(Delta)
+	with phase(profile,"Tdelta") as counts:
+		Tdelta = d.NFA(T)
+		Tdelta.add_edges(pairs,labels,fill_out=True)
+		counts["edges_added"] = len(pairs)
+	return (Delta,Tdelta)
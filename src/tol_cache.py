@@ -0,0 +1,184 @@
+import os
+import sys
+path_script=os.path.dirname(os.path.realpath(__file__))
+path_to_DESops = path_script[0:path_script.find('tolerancetool/src')]+'tolerancetool/lib/'
+
+sys.path.insert(1, path_to_DESops)
+#
+import DESops as d
+import hashlib
+import pickle
+import zlib
+from array import array
+
+# Version of the stored format, part of every key
+_FORMAT = 2
+
+
+def Fingerprint(A):
+	"""
+	Returns a canonical fingerprint (hex string) of the LTS A.
+	It depends on the states (index, name, marking, implicit completion sink), the transitions, the events and Euc/Euo,
+	but not on the order in which transitions or events were added.
+	"""
+	h = hashlib.sha256()
+	h.update(repr([(name,bool(marked)) for (name,marked) in zip(A.vs['name'],A.vs['marked'])]).encode())
+	h.update(repr(_sink(A)).encode())
+	h.update(repr(sorted((src,str(ev.label),tgt) for src,out in enumerate(A.vs['out']) for (tgt,ev) in out)).encode())
+	for events in (A.events,A.Euc,A.Euo):
+		h.update(repr(sorted(str(ev.label) for ev in events)).encode())
+	return h.hexdigest()
+
+
+def _sink(A):
+	# Index of the implicit completion sink of A (see tol_safety_property.completion_sink)
+	if 'sink' not in A.vs.attributes():
+		return None
+	return next((st for (st,flag) in enumerate(A.vs['sink']) if flag),None)
+
+
+def _encode(A):
+	# Compact binary form of A: event labels, names and marking, and the transitions as an int32 array
+	labels = sorted({ev.label for ev in A.events} | {ev.label for out in A.vs['out'] for (tgt,ev) in out},key=str)
+	event_id = {label: i for i,label in enumerate(labels)}
+	edges = array('i')
+	for src,out in enumerate(A.vs['out']):
+		for (tgt,ev) in out:
+			edges.extend((src,tgt,event_id[ev.label]))
+	init = A.vs['init'] if 'init' in A.vs.attributes() else [st == 0 for st in range(A.vcount())]
+	data = (labels,A.vs['name'],[bool(m) for m in A.vs['marked']],[bool(i) for i in init],_sink(A),
+		edges.tobytes(),
+		[event_id[ev.label] for ev in A.events],
+		[event_id[ev.label] for ev in A.Euc],
+		[event_id[ev.label] for ev in A.Euo])
+	return zlib.compress(pickle.dumps(data,protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _decode(blob):
+	(labels,names,marked,init,sink,edges,events,Euc,Euo) = pickle.loads(zlib.decompress(blob))
+	events_list = [d.Event(label) for label in labels]
+	triples = array('i')
+	triples.frombytes(edges)
+	A = d.NFA()
+	A.add_vertices(len(names),names,marked)
+	A.vs['init'] = init
+	if sink is not None:
+		A.vs['sink'] = [st == sink for st in range(len(names))]
+	A.add_edges([(triples[k],triples[k+1]) for k in range(0,len(triples),3)],
+		[events_list[triples[k+2]] for k in range(0,len(triples),3)],fill_out=True)
+	A.events = {events_list[i] for i in events}
+	A.Euc = {events_list[i] for i in Euc}
+	A.Euo = {events_list[i] for i in Euo}
+	return A
+
+
+class AssumptionCache:
+	"""
+	Persistent cache of weakest assumptions, stored in the directory path.
+
+	An entry is addressed by the fingerprints of the controller and of the property, so the
+	same (Ctr, Prop) pair read again from its files hits the cache. Entries are stored in a
+	compact binary form (zlib compressed) and evicted in least recently used order when the
+	directory holds more than max_bytes or max_entries.
+
+	>>> cache = AssumptionCache("weak-cache")
+	>>> trans2del = tolerance_safety(Env,Ctr,Prop,cache=cache)
+
+	Parameters:
+	path: directory of the cache (created if it does not exist)
+	max_bytes: maximum size of the stored entries
+	max_entries: maximum number of entries (None for no limit)
+	"""
+	def __init__(self,path,max_bytes=64*2**20,max_entries=None):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.max_entries = max_entries
+		self.hits = 0
+		self.misses = 0
+		os.makedirs(path,exist_ok=True)
+
+	def key(self,Ctr,Prop):
+		"""
+		Returns the key of the pair (Ctr, Prop)
+		"""
+		h = hashlib.sha256("{}:{}:{}".format(_FORMAT,Fingerprint(Ctr),Fingerprint(Prop)).encode())
+		return h.hexdigest()
+
+	def _file(self,key):
+		return os.path.join(self.path,key+".weak")
+
+	def load(self,Ctr,Prop):
+		"""
+		Returns the stored assumption of (Ctr, Prop), or None if it is not in the cache
+		"""
+		fname = self._file(self.key(Ctr,Prop))
+		try:
+			with open(fname,"rb") as f:
+				blob = f.read()
+			A = _decode(blob)
+		except (OSError,EOFError,zlib.error,pickle.UnpicklingError,ValueError):
+			self.misses += 1
+			return None
+		# The access time used for the LRU order is the modification time of the entry
+		os.utime(fname)
+		self.hits += 1
+		return A
+
+	def store(self,Ctr,Prop,A):
+		"""
+		Stores A as the assumption of (Ctr, Prop) and evicts the least recently used entries
+		"""
+		fname = self._file(self.key(Ctr,Prop))
+		tmp = fname+".{}.tmp".format(os.getpid())
+		with open(tmp,"wb") as f:
+			f.write(_encode(A))
+		os.replace(tmp,fname)
+		self._evict(keep=fname)
+
+	def get(self,Ctr,Prop,build):
+		"""
+		Returns the assumption of (Ctr, Prop), computed by build() and stored if it is not in the cache
+		"""
+		A = self.load(Ctr,Prop)
+		if A is None:
+			A = build()
+			self.store(Ctr,Prop,A)
+		return A
+
+	def _entries(self):
+		entries = []
+		for fname in os.listdir(self.path):
+			if fname.endswith(".weak"):
+				fname = os.path.join(self.path,fname)
+				try:
+					st = os.stat(fname)
+				except OSError:
+					continue
+				entries.append((st.st_mtime,st.st_size,fname))
+		return sorted(entries)
+
+	def _evict(self,keep=None):
+		entries = self._entries()
+		size = sum(e[1] for e in entries)
+		count = len(entries)
+		for (mtime,fsize,fname) in entries:
+			if size <= self.max_bytes and (self.max_entries is None or count <= self.max_entries):
+				break
+			if fname == keep:
+				continue
+			try:
+				os.remove(fname)
+			except OSError:
+				continue
+			size -= fsize
+			count -= 1
+
+	def clear(self):
+		"""
+		Removes every entry of the cache
+		"""
+		for (mtime,fsize,fname) in self._entries():
+			os.remove(fname)
+
+	def __len__(self):
+		return len(self._entries())
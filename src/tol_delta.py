@@ -0,0 +1,188 @@
+import os
+import sys
+path_script=os.path.dirname(os.path.realpath(__file__))
+path_to_DESops = path_script[0:path_script.find('tolerancetool/src')]+'tolerancetool/lib/'
+
+sys.path.insert(1, path_to_DESops)
+#
+import DESops as d
+import csv
+
+
+def _event_key(ev):
+	return str(ev.label)
+
+
+class DeltaSet:
+	"""
+	Symbolic representation of a tolerance level Delta.
+
+	Delta is stored as a list of rectangles (sources x events x targets) over the state
+	indices of the LTS T, minus the transitions that T already has. The rectangles must
+	be pairwise disjoint. Memory is proportional to |T| instead of |Q|^2.|Act|.
+
+	Transitions are exposed as (source name, Event, target name) triples, the same
+	format as the Delta list returned by Compute_tolerance_level.
+
+	Parameters:
+	T: LTS the rectangles refer to
+	rectangles: list of (sources, events, targets), sources/targets are sets of state
+		indices of T and events is a set of Event objects of T
+	"""
+	def __init__(self,T,rectangles):
+		self.names = list(T.vs['name'])
+		self.events = sorted(T.events,key=_event_key)
+		self.rectangles = []
+		for (src,events,tgt) in rectangles:
+			if src and events and tgt:
+				self.rectangles.append((frozenset(src),frozenset(events),frozenset(tgt)))
+		self._name2id = None
+		# rows[st] holds the rectangles whose source set contains st
+		self._rows = [[] for i in range(len(self.names))]
+		for r,(src,events,tgt) in enumerate(self.rectangles):
+			for st in src:
+				self._rows[st].append(r)
+		# Transitions of T covered by a rectangle. They do not belong to Delta.
+		self._removed = set()
+		for st in range(len(self.names)):
+			if not self._rows[st]:
+				continue
+			for (tgt,ev) in T.vs[st]['out']:
+				if self._in_rectangles(st,ev,tgt):
+					self._removed.add((st,ev,tgt))
+
+	def _in_rectangles(self,src,ev,tgt):
+		for r in self._rows[src]:
+			(_,events,targets) = self.rectangles[r]
+			if ev in events and tgt in targets:
+				return True
+		return False
+
+	def index(self,name):
+		"""
+		Returns the state index of T for a given state name
+		"""
+		if self._name2id is None:
+			self._name2id = {name: i for i,name in enumerate(self.names)}
+		return self._name2id[name]
+
+	def contains_index(self,src,ev,tgt):
+		"""
+		Returns True if the transition given by state indices (src,ev,tgt) is in Delta
+		"""
+		if not isinstance(ev,d.Event):
+			ev = d.Event(ev)
+		return self._in_rectangles(src,ev,tgt) and (src,ev,tgt) not in self._removed
+
+	def __contains__(self,trans):
+		(src,ev,tgt) = trans
+		try:
+			src = self.index(src)
+			tgt = self.index(tgt)
+		except KeyError:
+			return False
+		return self.contains_index(src,ev,tgt)
+
+	def __len__(self):
+		return sum(len(src)*len(events)*len(tgt) for (src,events,tgt) in self.rectangles)-len(self._removed)
+
+	def iter_index(self):
+		"""
+		Yields the transitions of Delta as (src index, Event, tgt index)
+		The order is deterministic: rectangle by rectangle, then by source index, event label and target index
+		"""
+		for (src,events,tgt) in self.rectangles:
+			events = sorted(events,key=_event_key)
+			tgt = sorted(tgt)
+			for st in sorted(src):
+				for ev in events:
+					for t in tgt:
+						if (st,ev,t) not in self._removed:
+							yield (st,ev,t)
+
+	def __iter__(self):
+		names = self.names
+		for (st,ev,t) in self.iter_index():
+			yield (names[st],ev,names[t])
+
+	def to_keys(self):
+		"""
+		Returns Delta as packed integer keys (tol_bitset.DeltaKeys, requires numpy)
+		"""
+		from tol_bitset import DeltaKeys
+		return DeltaKeys.from_rectangles(self.names,self.events,self.rectangles,self._removed)
+
+	def __repr__(self):
+		return "DeltaSet({} transitions, {} rectangles)".format(len(self),len(self.rectangles))
+
+
+class DeltaChunkWriter:
+	"""
+	Sink that writes a stream of Delta transitions to disk in fixed-size chunks.
+	At most chunk_size transitions are kept in memory.
+
+	Files written to the directory path:
+	csv: delta_<k>.csv with rows (source name, event label, target name)
+	npz: delta_<k>.npz with index arrays src, event, tgt, plus states.csv and events.csv
+		mapping indices to state names and event labels
+
+	Parameters:
+	path: output directory (created if it does not exist)
+	chunk_size: number of transitions per file
+	fmt: "csv" or "npz"
+	"""
+	def __init__(self,path,chunk_size=100000,fmt="csv"):
+		if fmt not in ("csv","npz"):
+			raise ValueError("Unknown chunk format {}".format(fmt))
+		self.path = path
+		self.chunk_size = chunk_size
+		self.fmt = fmt
+		self.files = []
+		self.count = 0
+		self._buffer = []
+
+	def start(self,names,events):
+		"""
+		Called before the first transition with the state names and the list of events
+		"""
+		os.makedirs(self.path,exist_ok=True)
+		self.names = names
+		self.events = list(events)
+		self._event_id = {ev: i for i,ev in enumerate(self.events)}
+		if self.fmt == "npz":
+			with open(os.path.join(self.path,"states.csv"),"w",newline="") as f:
+				csv.writer(f).writerows(enumerate(names))
+			with open(os.path.join(self.path,"events.csv"),"w",newline="") as f:
+				csv.writer(f).writerows((i,ev.label) for i,ev in enumerate(self.events))
+
+	def add(self,src,ev,tgt):
+		"""
+		Adds the transition (src,ev,tgt) given by state indices
+		"""
+		self._buffer.append((src,ev,tgt))
+		self.count += 1
+		if len(self._buffer) >= self.chunk_size:
+			self._flush()
+
+	def _flush(self):
+		if not self._buffer:
+			return
+		fname = os.path.join(self.path,"delta_{:05d}.{}".format(len(self.files),self.fmt))
+		if self.fmt == "csv":
+			names = self.names
+			with open(fname,"w",newline="") as f:
+				csv.writer(f).writerows((names[src],ev.label,names[tgt]) for (src,ev,tgt) in self._buffer)
+		else:
+			import numpy as np
+			np.savez(fname,
+				src=np.array([t[0] for t in self._buffer],dtype=np.int64),
+				event=np.array([self._event_id[t[1]] for t in self._buffer],dtype=np.int32),
+				tgt=np.array([t[2] for t in self._buffer],dtype=np.int64))
+		self.files.append(fname)
+		self._buffer = []
+
+	def close(self):
+		"""
+		Writes the remaining transitions
+		"""
+		self._flush()
@@ -6,7 +6,13 @@ path_to_DESops = path_script[0:path_script.find('tolerancetool/src')]+'tolerance
 sys.path.insert(1, path_to_DESops)
 #
 import DESops as d
+import ast
+import csv
+import json
 from itertools import product
+from tol_delta import DeltaSet, DeltaChunkWriter
+from tol_profile import phase
+from tol_invariant import InvariantMask, Compile_invariant
 
 
 
@@ -14,6 +20,11 @@ from itertools import product
 def Post(out_list,event):
 	return [x[0] for x in out_list if x[1].label==event]
 
+#Get the successors of state st in LTS T for a given event label
+#It uses the successor index cached on T, which is built once and rebuilt only after T is modified
+def Succ(T,st,event):
+	return T.successor_index()[st].get(event,[])
+
 
 #Computes the empty controller for LTS T
 #The empty controller selects empty tuples for each state in T
@@ -24,50 +35,66 @@ def Compute_empty_controller(T,Qinv):
 	return controller
 
 # Compute the finv for LTS T and invariant set Qinv; finv(q) = Ainv(q)
+# Qinv is a list of state names, or anything accepted by Compile_invariant (e.g. an InvariantMask)
 # It returns a controller as a dictionary where keys are state names and values are tuples with actions
 # controler[state_name] = tuple(actions)
-def Compute_inv_controller(T,Qinv):
-	Qinv_id = {v.index for v in T.vs if v['name'] in Qinv}
-	events = T.events
+# extra is optional: a dict (state index, event label): list of target indices with transitions added to T (see Compute_tolerant_controller)
+def Compute_inv_controller(T,Qinv,extra=None):
+	Qinv_id = set(Compile_invariant(T,Qinv).indices)
+	events = [ev.label for ev in T.events]
+	if extra:
+		labels = set(events)
+		events.extend({ev for (st,ev) in extra.keys() if ev not in labels})
+	else:
+		extra = dict()
 	controller = dict()
 	for st in range(len(T.vs)):
 		act = []
 		if st in Qinv_id:
 			for ev in events:
 				# print(T.vs[st]['out'])
-				post = Post(T.vs[st]['out'],ev.label)
+				post = Succ(T,st,ev)
 				# print([T.vs[id]['name'] for id in post])
-				if set(post).issubset(Qinv_id):
-					act.append(ev.label)
+				if set(post).issubset(Qinv_id) and set(extra.get((st,ev),())).issubset(Qinv_id):
+					act.append(ev)
 			controller[T.vs[st]['name']] = tuple(act)
 		else:
 			controller[T.vs[st]['name']] = tuple()
 	return controller
 
+#It reads a list of disturbances (source name, event, target name)
+#dist is either an iterable of triples, or the path to a .json file (list of triples) or to a .csv file (one triple per row)
+#State names in files starting with "(" are read as tuples, as in .fsm files
+def Load_disturbances(dist):
+	if not isinstance(dist,str):
+		return dist
+	with open(dist,"r",newline="") as f:
+		if dist.endswith(".json"):
+			rows = json.load(f)
+		else:
+			rows = list(csv.reader(f))
+	parse = lambda name: ast.literal_eval(name) if isinstance(name,str) and name.startswith("(") else name
+	return [(parse(t[0]),t[1],parse(t[2])) for t in rows]
+
 # Compute the least tolerant controller for LTS T, invariant set Qinv; finv(q) = Ainv(q), and minimum tolerance level d
 # d is a list with transitions that must be tolerated, e.g., d = [(state_1, action_name, state_2)] where state_1,state_2 should be valid 
+# d can also be an iterator or a file with the transitions (see Load_disturbances)
 # It returns a controller as a dictionary where keys are state names and values are tuples with actions
 # controler[state_name] = tuple(actions)
 def Compute_tolerant_controller(T,Qinv,dist):
-	Td = d.NFA(T)
-	edges = []
-	events = []
-	for t in dist:
+	name2id = {v['name']: v.index for v in T.vs}
+	# Transitions d added to T, by (source index, event label). T itself is not copied
+	extra = dict()
+	for t in Load_disturbances(dist):
 		# print(t[0],t[1],t[2])
-		src = T.vs.select(name = t[0])
-		tgt  = T.vs.select(name = t[2])
-		if not src and not tgt:
+		src = name2id.get(t[0])
+		tgt = name2id.get(t[2])
+		if src is None or tgt is None:
 			# print("Vertex name in ",t," disturbance list incorrect")
 			return
-		# print((src[0],tgt[0]))
-		src = src[0].index
-		tgt = tgt[0].index
-		
-		edges.append((src,tgt))
-		events.append(d.Event(t[1]))
-	Td.add_edges(edges,events,fill_out=True)	
-	# Need to compute Td. Add transitions d to T
-	controller = Compute_inv_controller(Td,Qinv)
+		ev = t[1].label if isinstance(t[1],d.Event) else t[1]
+		extra.setdefault((src,ev),[]).append(tgt)
+	controller = Compute_inv_controller(T,Qinv,extra)
 	return controller
 
 #It calculates the controlled behavior of Env under control of controller
@@ -84,7 +111,7 @@ def Control(Env, controller):
 		else:
 			continue
 		for ev in event:
-			post = Post(Env.vs[st]['out'],ev)
+			post = Succ(Env,st,ev)
 			for target in post:
 				target_name = Env.vs[target]
 				edges.append({"pair": (src_index, target), "label": d.Event(ev)})
@@ -105,20 +132,248 @@ def Control(Env, controller):
 #Function to compute tolerance level of controller f, given LTS T and invariance set of states Qinv (string names of the states)
 # T is an LTS (DFA or NFA)
 # f is a dict defined as state: tuple of actions. For example f = {'1':(a,), '2': ('a','b')}
-# Qinv is a list with the state names of invariant states
-def Compute_tolerance_level(T,f,Qinv_name):
-	Not_Qinv = [v.index for v in T.vs if v['name'] not in Qinv_name]
-	Qinv = [v.index for v in T.vs if v['name'] in Qinv_name]
-	Tinv = Extend_Env_Qinv(T,Qinv) #Compute T_{Qinv x Act x Qinv}
-	Tinvf = Control(Tinv,f) #To identify the actions used by controller in each state
-	inacc = d.basic_operations.unary.find_inacc(Tinvf) #Find the unreachable states
-	Acc = [st.index for st in Tinvf.vs if st.index not in inacc] #Find the reachable states
-	Tdelta = Extend_Env_Total(Tinvf,Tinv,Not_Qinv,Acc)
-	# Delta = [(Tdelta.vs[e.source]['name'],e['label'],Tdelta.vs[e.target]['name']) for e in Tdelta.es if not T.es.select(_source_eq =e.source,_target_eq=e.target,label_eq=e['label'])]
-	Delta = [(Tdelta.vs[e.source]['name'],e['label'],Tdelta.vs[e.target]['name']) for e in Tdelta.es if (e.target,e['label']) not in T.vs[e.source]['out']]
+# Qinv is a list with the state names of invariant states, or anything accepted by Compile_invariant
+# (a predicate, a bitmask or an InvariantMask compiled once and reused across calls)
+# If symbolic is True, Delta is returned as a DeltaSet (rectangles minus the transitions of T) and Tdelta is not built (None is returned)
+# backend selects how Tdelta and Delta are computed: "python" (default) or "numpy" (bitset engine in tol_bitset, requires numpy)
+# profile is optional: a tol_profile.Profile that records time, memory and counts of each phase
+def Compute_tolerance_level(T,f,Qinv_name,symbolic=False,backend="python",profile=None):
+	if backend == "numpy" and not symbolic:
+		from tol_bitset import Compute_tolerance_level_bits
+		return Compute_tolerance_level_bits(T,f,Qinv_name,profile)
+	with phase(profile,"Qinv",states=len(T.vs)) as counts:
+		mask = Compile_invariant(T,Qinv_name)
+		Not_Qinv = list(mask.unsafe)
+		Qinv = list(mask.indices)
+		counts["Qinv"] = len(Qinv)
+	if symbolic:
+		with phase(profile,"Controlled_reach") as counts:
+			used = Controlled_reach(T,f,Qinv)
+			counts["reachable"] = len(used)
+		with phase(profile,"DeltaSet") as counts:
+			Delta = DeltaSet(T,Delta_rectangles(T,f,Qinv,Not_Qinv,used))
+			counts["rectangles"] = len(Delta.rectangles)
+			counts["transitions"] = len(Delta)
+		return (Delta,None)
+	with phase(profile,"Extend_Env_Qinv") as counts:
+		Tinv = Extend_Env_Qinv(T,Qinv) #Compute T_{Qinv x Act x Qinv}
+		counts["edges_added"] = len(Tinv.es)-len(T.es)
+	with phase(profile,"Control") as counts:
+		Tinvf = Control(Tinv,f) #To identify the actions used by controller in each state
+		counts["edges"] = len(Tinvf.es)
+	with phase(profile,"find_inacc") as counts:
+		inacc = d.basic_operations.unary.find_inacc(Tinvf) #Find the unreachable states
+		Acc = [st.index for st in Tinvf.vs if st.index not in inacc] #Find the reachable states
+		counts["reachable"] = len(Acc)
+	with phase(profile,"Extend_Env_Total") as counts:
+		Tdelta = Extend_Env_Total(Tinvf,Tinv,Not_Qinv,Acc)
+		counts["edges_added"] = len(Tdelta.es)-len(Tinv.es)
+	with phase(profile,"Delta") as counts:
+		# Delta = [(Tdelta.vs[e.source]['name'],e['label'],Tdelta.vs[e.target]['name']) for e in Tdelta.es if not T.es.select(_source_eq =e.source,_target_eq=e.target,label_eq=e['label'])]
+		Delta = [(Tdelta.vs[e.source]['name'],e['label'],Tdelta.vs[e.target]['name']) for e in Tdelta.es if e.target not in Succ(T,e.source,e['label'].label)]
+		counts["transitions"] = len(Delta)
 	return (Delta,Tdelta)
 
 
+#One step of Control(Extend_Env_Qinv(T,Qinv),f) from state index st; events maps event labels to the events of T
+#It returns the set of events of T used by f in st, the successors of st in T, and whether st reaches every state in Qinv through the extension
+def Controlled_post(T,f,Qinv,events,st):
+	used = set()
+	post = set()
+	name = T.vs[st]['name']
+	if name not in f.keys():
+		return (used,post,False)
+	for ev in f[name]:
+		if ev not in events:
+			continue
+		succ = Succ(T,st,ev)
+		if st in Qinv or succ:
+			used.add(events[ev])
+		post.update(succ)
+	return (used,post,st in Qinv and bool(used))
+
+#It extends the dict used (reachable state index: events used by f) with the states reachable from the states in to_visit
+#States in to_visit must not be in used yet. It returns the list of states added to used
+def Extend_reach(T,f,Qinv,events,used,to_visit):
+	to_visit = list(to_visit)
+	visited = list(to_visit)
+	for st in to_visit:
+		used[st] = set()
+	Qinv_visited = False
+	while to_visit:
+		st = to_visit.pop()
+		(used[st],post,jump) = Controlled_post(T,f,Qinv,events,st)
+		if jump and not Qinv_visited:
+			Qinv_visited = True
+			post.update(Qinv)
+		for tgt in post:
+			if tgt not in used:
+				used[tgt] = set()
+				to_visit.append(tgt)
+				visited.append(tgt)
+	return visited
+
+#It computes the states reachable in Control(Extend_Env_Qinv(T,Qinv),f) without building the extension
+#In the extension, every event of T leads from a state in Qinv to every state in Qinv
+#It returns a dict where keys are the reachable state indices and values are the sets of events of T used by f in that state
+def Controlled_reach(T,f,Qinv):
+	if not len(T.vs):
+		return dict()
+	Qinv = set(Qinv)
+	events = {ev.label: ev for ev in T.events}
+	used = dict()
+	Extend_reach(T,f,Qinv,events,used,[0])
+	return used
+
+#It computes Delta for controller f as a list of disjoint rectangles (sources, events, targets)
+#The transitions of T inside the rectangles are not part of Delta (see tol_delta.DeltaSet)
+#Rectangles: Qinv x Act x Qinv, Unsafe x Act x Q, and for states in Qinv, the events not used by f towards Unsafe
+#used is optional, the result of Controlled_reach(T,f,Qinv) if it is already known
+def Delta_rectangles(T,f,Qinv,Unsafe,used=None):
+	events = frozenset(T.events)
+	Qinv = frozenset(Qinv)
+	Unsafe = frozenset(Unsafe)
+	if used is None:
+		used = Controlled_reach(T,f,Qinv)
+	rectangles = [(Qinv,events,Qinv),(Unsafe,events,frozenset(range(len(T.vs))))]
+	# Reachable states in Qinv grouped by the events that f does not use
+	not_used = dict()
+	for st in sorted(used.keys()):
+		if st in Qinv:
+			not_used.setdefault(events-used[st],[]).append(st)
+	for (ev,src) in not_used.items():
+		rectangles.append((frozenset(src),ev,Unsafe))
+	rectangles.append((Qinv.difference(used),events,Unsafe))
+	return rectangles
+
+#Function to compute the tolerance level of many controllers, given LTS T and invariance set of states Qinv (string names of the states)
+#T extended with Qinv x Act x Qinv is built once and shared by a pool of workers processes (bitset engine in tol_bitset, requires numpy)
+#controllers is a list of controllers f, workers is the number of processes (None uses every CPU)
+#It returns a list with one (size of Delta, Delta as a DeltaSet) per controller, in the order of controllers
+def Compute_tolerance_levels(T,controllers,Qinv_name,workers=None):
+	from tol_bitset import Compute_tolerance_levels_bits
+	mask = Compile_invariant(T,Qinv_name)
+	Not_Qinv = mask.unsafe
+	Qinv = mask.indices
+	levels = []
+	for (size,used) in Compute_tolerance_levels_bits(T,controllers,mask,workers):
+		levels.append((size,DeltaSet(T,Delta_rectangles(T,None,Qinv,Not_Qinv,used))))
+	return levels
+
+#Generator over the transitions of Delta for controller f, given LTS T and invariance set of states Qinv (string names of the states)
+#Transitions (source name, Event, target name) are yielded lazily in a deterministic order and Tdelta is never built
+#sink is optional (e.g. tol_delta.DeltaChunkWriter); every yielded transition is also added to it
+def Stream_delta(T,f,Qinv_name,sink=None):
+	(Delta,_) = Compute_tolerance_level(T,f,Qinv_name,symbolic=True)
+	names = Delta.names
+	if sink is not None:
+		sink.start(names,sorted(T.events,key=lambda ev: str(ev.label)))
+	try:
+		for (src,ev,tgt) in Delta.iter_index():
+			if sink is not None:
+				sink.add(src,ev,tgt)
+			yield (names[src],ev,names[tgt])
+	finally:
+		if sink is not None:
+			sink.close()
+
+#Writes Delta for controller f to disk in chunks of chunk_size transitions (fmt is "csv" or "npz")
+#It returns the list of files written
+def Write_delta(T,f,Qinv_name,path,chunk_size=100000,fmt="csv"):
+	sink = DeltaChunkWriter(path,chunk_size,fmt)
+	for _ in Stream_delta(T,f,Qinv_name,sink):
+		pass
+	return sink.files
+
+class ToleranceSession:
+	"""
+	Tolerance level of a controller f for LTS T and invariance set Qinv_name that is kept up to date
+	while f is edited locally.
+
+	The session holds the reachable states of Control(Tinv,f) and the events used by f in each of them.
+	Tinv = Extend_Env_Qinv(T,Qinv) is kept implicit (see Controlled_reach).
+	update_controller only recomputes the change of the reachable set and the Delta rows
+	(state in Qinv x unused events x Unsafe) of the affected states.
+
+	Parameters:
+	T: LTS (DFA or NFA)
+	f: controller, dict state name: tuple of actions
+	Qinv_name: list with the state names of invariant states, or anything accepted by Compile_invariant
+	"""
+	def __init__(self,T,f,Qinv_name):
+		self.T = T
+		self.f = dict(f)
+		mask = Compile_invariant(T,Qinv_name)
+		self.Qinv = frozenset(mask.indices)
+		self.Unsafe = frozenset(mask.unsafe)
+		self.events = {ev.label: ev for ev in T.events}
+		self.used = Controlled_reach(T,self.f,self.Qinv)
+		self._name2id = {v['name']: v.index for v in T.vs}
+
+	def delta(self):
+		"""
+		Returns the current Delta as a DeltaSet
+		"""
+		return DeltaSet(self.T,Delta_rectangles(self.T,self.f,self.Qinv,self.Unsafe,self.used))
+
+	def _row(self,used,st):
+		# Events of the Delta row from state st in Qinv towards Unsafe
+		if st in used:
+			return frozenset(self.events.values()).difference(used[st])
+		return frozenset(self.events.values())
+
+	def update_controller(self,changes):
+		"""
+		Changes the actions of f in some states and updates the session
+
+		Returns: (added, removed), the transitions (source name, Event, target name) added to and removed from Delta
+
+		Parameters:
+		changes: dict state name: tuple of actions
+		"""
+		T = self.T
+		changed = sorted(self._name2id[name] for name in changes.keys())
+		old_f = {name: self.f[name] for name in changes.keys() if name in self.f.keys()}
+		self.f.update(changes)
+		old_rows = {st: self._row(self.used,st) for st in changed}
+		shrink = False
+		seeds = set()
+		new_used = dict()
+		for st in changed:
+			if st not in self.used:
+				continue
+			(_,old_post,old_jump) = Controlled_post(T,old_f,self.Qinv,self.events,st)
+			(new_used[st],new_post,new_jump) = Controlled_post(T,self.f,self.Qinv,self.events,st)
+			if not new_post.issuperset(old_post) or (old_jump and not new_jump):
+				shrink = True
+			seeds.update(new_post)
+			if new_jump:
+				seeds.update(self.Qinv)
+		if shrink:
+			# Successors were removed: reachability is recomputed from the initial state
+			used = Controlled_reach(T,self.f,self.Qinv)
+			affected = set(changed).union(used.keys()^self.used.keys())
+			old_rows.update((st,self._row(self.used,st)) for st in affected if st not in old_rows)
+			self.used = used
+		else:
+			self.used.update(new_used)
+			reached = Extend_reach(T,self.f,self.Qinv,self.events,self.used,[st for st in seeds if st not in self.used])
+			affected = set(changed).union(reached)
+			old_rows.update((st,self._row(dict(),st)) for st in reached if st not in old_rows)
+		added = []
+		removed = []
+		names = T.vs['name']
+		Unsafe = sorted(self.Unsafe)
+		for st in sorted(affected):
+			if st not in self.Qinv:
+				continue
+			old = old_rows[st]
+			new = self._row(self.used,st)
+			for (ev_set,diff) in ((new-old,added),(old-new,removed)):
+				for ev in sorted(ev_set,key=lambda ev: str(ev.label)):
+					diff.extend((names[st],ev,names[uns]) for uns in Unsafe if uns not in Succ(T,st,ev.label))
+		return (added,removed)
+
 # It receives an NFA and a list of transition contraints 
 # It return an NFA where its transition relation is defined by the intersection of the transition relation of the given NFA and the list of transition constraints
 def Transition_contraint(T,trans_contraint):
@@ -128,7 +383,8 @@ def Transition_contraint(T,trans_contraint):
 def Extend_Env_Qinv(Env,Qinv):
 	Ext = d.NFA(Env)
 	events = list(Env.events)
-	edges = [{"pair": (src, tgt), "label": e} for src in Qinv for tgt in Qinv for e in events if (tgt,e) not in Env.vs[src]['out']]
+	succ = Env.successor_index()
+	edges = [{"pair": (src, tgt), "label": e} for src in Qinv for tgt in Qinv for e in events if tgt not in succ[src].get(e.label,())]
 	Ext.add_edges(
 	[e["pair"] for e in edges],
 	[e["label"] for e in edges],
@@ -166,15 +422,17 @@ def Extend_Env_Total(Env,Env_ext,Unsafe,Acc):
     #         events_1,
     #         fill_out=True,
     #     )
-	edges = [{"pair": (src, tgt), "label": e} for src in Unsafe for tgt in Q for e in events if (tgt,e) not in Env.vs[src]['out']]
+	succ = Env.successor_index()
+	edges = [{"pair": (src, tgt), "label": e} for src in Unsafe for tgt in Q for e in events if tgt not in succ[src].get(e.label,())]
     # left_out = []
+	Acc = set(Acc)
+	Unsafe_set = set(Unsafe)
 	for id in Q:
 		if id in Acc:
-			control_action = {out[1] for out in Env.vs[id]['out']}
-			not_used = Env.events - control_action
-			edges.extend([{"pair": (id, uns), "label": e} for uns in Unsafe for e in not_used if (uns,e) not in Env.vs[id]['out']])
-		elif id not in Unsafe:
-			edges.extend([{"pair": (id, uns), "label": e} for uns in Unsafe for e in events if (uns,e) not in Env.vs[id]['out']])
+			not_used = {e for e in Env.events if e.label not in succ[id]}
+			edges.extend([{"pair": (id, uns), "label": e} for uns in Unsafe for e in not_used])
+		elif id not in Unsafe_set:
+			edges.extend([{"pair": (id, uns), "label": e} for uns in Unsafe for e in events if uns not in succ[id].get(e.label,())])
 	Ext.add_edges(
             [e["pair"] for e in edges],
             [e["label"] for e in edges],
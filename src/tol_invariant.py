@@ -0,0 +1,93 @@
+import os
+import sys
+path_script=os.path.dirname(os.path.realpath(__file__))
+path_to_DESops = path_script[0:path_script.find('tolerancetool/src')]+'tolerancetool/lib/'
+
+sys.path.insert(1, path_to_DESops)
+#
+import DESops as d
+
+
+class InvariantMask:
+	"""
+	Invariant set Qinv compiled into a mask over the state indices of an LTS T.
+	It is built once with Compile_invariant and can be passed instead of the list of
+	invariant state names to the tolerance and controller functions.
+
+	Attributes:
+	mask: bytearray, mask[i] is 1 if state index i is in Qinv
+	indices: tuple with the state indices in Qinv (increasing)
+	unsafe: tuple with the state indices not in Qinv (increasing)
+	"""
+	def __init__(self,mask):
+		self.mask = bytearray(mask)
+		self.indices = tuple(i for i,b in enumerate(self.mask) if b)
+		self.unsafe = tuple(i for i,b in enumerate(self.mask) if not b)
+
+	def __len__(self):
+		return len(self.indices)
+
+	def __contains__(self,st):
+		return 0 <= st < len(self.mask) and self.mask[st] == 1
+
+	def to_int(self):
+		"""
+		Returns Qinv as an integer bitmask, bit i is set if state index i is in Qinv
+		"""
+		return int("".join("1" if b else "0" for b in reversed(self.mask)) or "0",2)
+
+	def __repr__(self):
+		return "InvariantMask({} of {} states)".format(len(self.indices),len(self.mask))
+
+
+def Name_components(name):
+	"""
+	Returns the components of a state name as a flat tuple.
+	Names of parallel compositions are nested tuples, e.g. (('2','a3'),'b4') -> ('2','a3','b4')
+	"""
+	if not isinstance(name,tuple):
+		return (name,)
+	comps = ()
+	for part in name:
+		comps += Name_components(part)
+	return comps
+
+
+def Compile_invariant(T,inv,components=False):
+	"""
+	Compiles an invariant set of states of the LTS T into an InvariantMask.
+	The mask is computed in one pass over the states of T.
+
+	Returns: InvariantMask
+
+	Parameters:
+	T: LTS (DFA or NFA)
+	inv: one of
+		InvariantMask: returned as it is
+		callable: predicate over state names, pred(name) -> bool
+		int: bitmask over state indices (bit i is state index i)
+		sequence of bool with one value per state of T: mask over state indices
+		iterable of state names (list, set, ...)
+	components: if True, the predicate is called with the components of the name,
+		pred(*Name_components(name)), e.g. pred(ego,adv) for states (ego,adv)
+	"""
+	n = len(T.vs)
+	if isinstance(inv,InvariantMask):
+		if len(inv.mask) != n:
+			raise d.error.IncongruencyError("Invariant mask has {} states, LTS has {}".format(len(inv.mask),n))
+		return inv
+	if callable(inv):
+		if components:
+			return InvariantMask(bool(inv(*Name_components(name))) for name in T.vs['name'])
+		return InvariantMask(bool(inv(name)) for name in T.vs['name'])
+	if isinstance(inv,int) and not isinstance(inv,bool):
+		bits = bin(inv)[:1:-1] if inv >= 0 else ""
+		if inv < 0 or len(bits) > n:
+			raise d.error.IncongruencyError("Invariant bitmask has states out of the range of the LTS")
+		return InvariantMask(bits[i] == "1" if i < len(bits) else False for i in range(n))
+	if hasattr(inv,"dtype") and inv.dtype == bool or isinstance(inv,(list,tuple)) and len(inv) > 0 and all(isinstance(b,bool) for b in inv):
+		if len(inv) != n:
+			raise d.error.IncongruencyError("Invariant mask has {} states, LTS has {}".format(len(inv),n))
+		return InvariantMask(bool(b) for b in inv)
+	names = inv if isinstance(inv,(set,frozenset,dict)) else set(inv)
+	return InvariantMask(name in names for name in T.vs['name'])
@@ -0,0 +1,82 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Profile:
+	"""
+	Opt-in record of the phases of a tolerance computation.
+	Functions of tol_inv_property and tol_safety_property accept profile=Profile() and
+	add one entry per phase with its wall time, its peak traced memory and element counts.
+
+	>>> profile = Profile()
+	>>> (Delta,Tdelta) = Compute_tolerance_level(T,f,Qinv,profile=profile)
+	>>> profile.to_json("report.json")
+
+	Parameters:
+	trace_memory: if True, memory is traced with tracemalloc while a phase runs (slows down the computation)
+	"""
+	def __init__(self,trace_memory=True):
+		self.trace_memory = trace_memory
+		self.phases = []
+
+	@contextmanager
+	def phase(self,name,**counts):
+		"""
+		Context manager recording one phase. It yields the dict of counts of the phase,
+		which the caller can fill in (e.g. counts["edges_added"] = n)
+		"""
+		record = {"name": name, "time": 0.0, "peak_memory": None, "counts": dict(counts)}
+		started = False
+		if self.trace_memory:
+			if not tracemalloc.is_tracing():
+				tracemalloc.start()
+				started = True
+			elif hasattr(tracemalloc,"reset_peak"):
+				tracemalloc.reset_peak()
+			base = tracemalloc.get_traced_memory()[0]
+		start = time.perf_counter()
+		try:
+			yield record["counts"]
+		finally:
+			record["time"] = time.perf_counter()-start
+			if self.trace_memory:
+				record["peak_memory"] = tracemalloc.get_traced_memory()[1]-base
+				if started:
+					tracemalloc.stop()
+			self.phases.append(record)
+
+	def report(self):
+		"""
+		Returns the phases as a dict that can be dumped to JSON
+		"""
+		return {"total_time": sum(p["time"] for p in self.phases), "phases": self.phases}
+
+	def to_json(self,path=None):
+		"""
+		Returns the report as a JSON string, and writes it to path if given
+		"""
+		text = json.dumps(self.report(),indent=2,default=str)
+		if path is not None:
+			with open(path,"w") as f:
+				f.write(text)
+		return text
+
+	def __str__(self):
+		lines = ["{:<24}{:>12}{:>16}  counts".format("phase","time (s)","peak mem (B)")]
+		for p in self.phases:
+			lines.append("{:<24}{:>12.4f}{:>16}  {}".format(p["name"],p["time"],str(p["peak_memory"]),p["counts"]))
+		return "\n".join(lines)
+
+
+@contextmanager
+def phase(profile,name,**counts):
+	"""
+	Records a phase in profile, or does nothing when profile is None
+	"""
+	if profile is None:
+		yield dict(counts)
+	else:
+		with profile.phase(name,**counts) as record:
+			yield record
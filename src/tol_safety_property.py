@@ -8,279 +8,64 @@ sys.path.insert(1, path_to_DESops)
 import DESops as d
 from itertools import product,combinations
 from collections import deque
+from heapq import heappush, heappop
+from array import array
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+from tol_profile import phase
+from tol_antichain import Antichain
 
 def parallel(*automata: d.NFA) -> d.NFA:
 	"""
 	Computes the parallel composition of 2 (or more) LTS in a BFS manner, and returns the resulting composition as a new LTS.
+	All the LTS are composed in a single run of d.composition.parallel_kernel, only the reachable tuples of states are built
 	"""
+	return _parallel(automata)
 
-	G1 = automata[0]
-	input_list = automata[1:]
-
-	if any(i.vcount() == 0 for i in automata):
-		# if any inputs are empty, return empty automata
-		return d.DFA()
-
-	for G2 in input_list:
-		G_out = d.NFA()
-		
-		G1_x0 = G1.vs[0]
-		G2_x0 = G2.vs[0]
-		G_out_vertices = [
-		    {
-		        "name": (G1_x0["name"], G2_x0["name"]),
-		        "marked": G1_x0["marked"] and G2_x0["marked"],
-		    }
-		]
-		G_out_names = {G_out_vertices[i]["name"]: i for i in range(len(G_out_vertices))}
-		G_out_edges = []  # type: List[Dict[str, Any]]
-
-		queue = deque([(G1_x0, G2_x0)])
-		private_G1 = G1.events - G2.events
-		private_G2 = G2.events - G1.events
-		while len(queue) > 0:
-			x1, x2 = queue.popleft()
-			active_x1 = {e[1]: e[0] for e in x1["out"]}
-			active_x2 = {e[1]: e[0] for e in x2["out"]}
-			active_both = set(active_x1.keys()) & set(active_x2.keys())
-			cur_name = (x1["name"], x2["name"])
-			src_index = G_out_names[cur_name]
-
-			for e in set(active_x1.keys()) | set(active_x2.keys()):
-				st1 = st2 = []
-				if e in active_both:
-					st1 = [st for (st,ev) in x1['out'] if ev == e]
-					st2 = [st for (st,ev) in x2['out'] if ev == e]
-					for x1_d_id in st1:
-						for x2_d_id in st2:
-							x1_dst = G1.vs[x1_d_id]
-							x2_dst = G2.vs[x2_d_id]
-							dst_name = (x1_dst["name"], x2_dst["name"])
-							dst_index = G_out_names.get(dst_name)
-
-							if dst_index is None:
-								G_out_vertices.append(
-									{
-										"name": dst_name,
-										"marked": x1_dst["marked"] and x2_dst["marked"],
-									}
-								)
-								dst_index = len(G_out_vertices) - 1
-								G_out_names[dst_name] = dst_index
-								queue.append((x1_dst, x2_dst))
-
-							G_out_edges.append({"pair": (src_index, dst_index), "label": e})
-					
-				elif e in private_G1:
-					st1 = [st for (st,ev) in x1['out'] if ev == e]
-					x2_dst = x2
-					for x1_d_id in st1:
-						x1_dst = G1.vs[x1_d_id]
-						dst_name = (x1_dst["name"], x2_dst["name"])
-						dst_index = G_out_names.get(dst_name)
-
-						if dst_index is None:
-							G_out_vertices.append(
-								{
-									"name": dst_name,
-									"marked": x1_dst["marked"] and x2_dst["marked"],
-								}
-							)
-							dst_index = len(G_out_vertices) - 1
-							G_out_names[dst_name] = dst_index
-							queue.append((x1_dst, x2_dst))
-
-						G_out_edges.append({"pair": (src_index, dst_index), "label": e})	
-				elif e in private_G2:
-					x1_dst = x1
-					st2 = [st for (st,ev) in x2['out'] if ev == e]
-					
-					for x2_d_id in st2:
-						x2_dst = G2.vs[x2_d_id]
-						dst_name = (x1_dst["name"], x2_dst["name"])
-						dst_index = G_out_names.get(dst_name)
-
-						if dst_index is None:
-							G_out_vertices.append(
-								{
-									"name": dst_name,
-									"marked": x1_dst["marked"] and x2_dst["marked"],
-								}
-							)
-							dst_index = len(G_out_vertices) - 1
-							G_out_names[dst_name] = dst_index
-							queue.append((x1_dst, x2_dst))
-
-						G_out_edges.append({"pair": (src_index, dst_index), "label": e})
-				else:
-					continue
-				
-
-		G_out.add_vertices(
-			len(G_out_vertices),
-			[v["name"] for v in G_out_vertices],
-			[v["marked"] for v in G_out_vertices],
-		)
-		G_out.add_edges(
-			[e["pair"] for e in G_out_edges],
-			[e["label"] for e in G_out_edges],
-			fill_out=True,
-		)
-		G_out.events = G1.events | G2.events
-		G_out.Euc.update(G1.Euc | G2.Euc)
-		G_out.Euo.update(G1.Euo | G2.Euo)
-		G1 = G_out
-	G_out.vs[0]['init'] = True
-	return G_out
 def parallel_error(*automata: d.NFA) -> d.NFA:
 	"""
 	Computes the parallel composition of 2 (or more) Automata in a BFS manner, and returns the resulting composition as a new Automata.
+	The states where a component other than the first one is err are merged into a single err state (state 1), which is not explored
 	"""
+	return _parallel(automata,error=True)
 
-	G1 = automata[0]
-	input_list = automata[1:]
-
+def _parallel(automata,error=False):
+	# N-ary composition with parallel_kernel. The out lists include the transitions to the implicit completion sinks
 	if any(i.vcount() == 0 for i in automata):
 		# if any inputs are empty, return empty automata
 		return d.DFA()
 
-	for G2 in input_list:
-		G_out = d.NFA()
-		
-		G1_x0 = G1.vs[0]
-		G2_x0 = G2.vs[0]
-		# G_out_vertices = [{
-		#         "name": (G1_x["name"], G2_x["name"]),
-		#         "marked": G1_x["marked"] and G2_x["marked"],
-		#     } for G1_x in G1.vs for G2_x in G2.vs]
-		# G_out_names = {G_out_vertices[i]["name"]: i for i in range(len(G_out_vertices))}
-		# G_out_edges = []  # type: List[Dict[str, Any]]
-
-		# queue = deque([(G1_x, G2_x) for G1_x in G1.vs for G2_x in G2.vs])
-		# G_out_vertices = [{
-		# 		"name": (G1_x["name"], G2_x["name"]),
-		# 		"marked": G1_x["marked"] and G2_x["marked"],
-		# 	} for G1_x in G1.vs for G2_x in G2.vs]
-		# print(G_out_vertices)
-		G_out_vertices = [
-		    {
-		        "name": (G1_x0["name"], G2_x0["name"]),
-		        "marked": G1_x0["marked"] and G2_x0["marked"],
-		    },
-			{
-		        "name": 'err',
-		        "marked": 1,
-		    }
-		]
-		G_out_names = {G_out_vertices[i]["name"]: i for i in range(len(G_out_vertices))}
-		G_out_edges = []  # type: List[Dict[str, Any]]
-
-		queue = deque([(G1_x0, G2_x0)])
-		private_G1 = G1.events - G2.events
-		private_G2 = G2.events - G1.events
-		while len(queue) > 0:
-			x1, x2 = queue.popleft()
-			active_x1 = {e[1]: e[0] for e in x1["out"]}
-			active_x2 = {e[1]: e[0] for e in x2["out"]}
-			active_both = set(active_x1.keys()) & set(active_x2.keys())
-			cur_name = (x1["name"], x2["name"])
-			src_index = G_out_names[cur_name]
-
-			for e in set(active_x1.keys()) | set(active_x2.keys()):
-				st1 = st2 = []
-				if e in active_both:
-					st1 = [st for (st,ev) in x1['out'] if ev == e]
-					st2 = [st for (st,ev) in x2['out'] if ev == e]
-					for x1_d_id in st1:
-						for x2_d_id in st2:
-							x1_dst = G1.vs[x1_d_id]
-							x2_dst = G2.vs[x2_d_id]
-							if x2_dst['name'] == 'err':
-								dst_name = 'err'
-							else:
-								dst_name = (x1_dst["name"], x2_dst["name"])
-							dst_index = G_out_names.get(dst_name)
-
-							if dst_index is None:
-								G_out_vertices.append(
-									{
-										"name": dst_name,
-										"marked": x1_dst["marked"] and x2_dst["marked"],
-									}
-								)
-								dst_index = len(G_out_vertices) - 1
-								G_out_names[dst_name] = dst_index
-								queue.append((x1_dst, x2_dst))
-
-							G_out_edges.append({"pair": (src_index, dst_index), "label": e})
-					
-				elif e in private_G1:
-					st1 = [st for (st,ev) in x1['out'] if ev == e]
-					x2_dst = x2
-					for x1_d_id in st1:
-						x1_dst = G1.vs[x1_d_id]
-						dst_name = (x1_dst["name"], x2_dst["name"])
-						dst_index = G_out_names.get(dst_name)
-
-						if dst_index is None:
-							G_out_vertices.append(
-								{
-									"name": dst_name,
-									"marked": x1_dst["marked"] and x2_dst["marked"],
-								}
-							)
-							dst_index = len(G_out_vertices) - 1
-							G_out_names[dst_name] = dst_index
-							queue.append((x1_dst, x2_dst))
-
-						G_out_edges.append({"pair": (src_index, dst_index), "label": e})	
-				elif e in private_G2:
-					x1_dst = x1
-					st2 = [st for (st,ev) in x2['out'] if ev == e]
-					
-					for x2_d_id in st2:
-						x2_dst = G2.vs[x2_d_id]
-						if x2_dst['name'] == 'err':
-							dst_name = 'err'
-						else:
-							dst_name = (x1_dst["name"], x2_dst["name"])
-						dst_index = G_out_names.get(dst_name)
-
-						if dst_index is None:
-							G_out_vertices.append(
-								{
-									"name": dst_name,
-									"marked": x1_dst["marked"] and x2_dst["marked"],
-								}
-							)
-							dst_index = len(G_out_vertices) - 1
-							G_out_names[dst_name] = dst_index
-							queue.append((x1_dst, x2_dst))
-
-						G_out_edges.append({"pair": (src_index, dst_index), "label": e})
-				else:
-					continue
-				
-
-		G_out.add_vertices(
-			len(G_out_vertices),
-			[v["name"] for v in G_out_vertices],
-			[v["marked"] for v in G_out_vertices],
-		)
-		G_out.add_edges(
-			[e["pair"] for e in G_out_edges],
-			[e["label"] for e in G_out_edges],
-			fill_out=True,
-		)
-		G_out.events = G1.events | G2.events
-		G_out.Euc.update(G1.Euc | G2.Euc)
-		G_out.Euo.update(G1.Euo | G2.Euo)
-
-		G1 = G_out
+	G_out = d.NFA()
+	(events,ids) = d.composition.event_ids(*automata)
+	tables = []
+	for G in automata:
+		out = _completed_out(G)
+		tables.append(d.composition.transition_tables((out(st) for st in range(G.vcount())),ids))
+	absorbing = None
+	if error:
+		absorbing = [None]+[{st for (st,name) in enumerate(G.vs['name']) if name == 'err'} for G in automata[1:]]
+	(states,sources,targets,labels) = d.composition.parallel_kernel(tables,[{ids[e] for e in G.events} for G in automata],absorbing)
+	# Names are decoded from the tuples of component states
+	names = d.composition.nested_names(automata,[x if x is not None else (0,)*len(automata) for x in states])
+	markings = [G.vs['marked'] for G in automata]
+	marked = []
+	for (i,x) in enumerate(states):
+		if x is None:
+			names[i] = 'err'
+			marked.append(1)
+		else:
+			marked.append(all(markings[j][xj] for (j,xj) in enumerate(x)))
+	G_out.add_vertices(len(states),names,marked)
+	G_out.add_edges(list(zip(sources,targets)),[events[e] for e in labels],fill_out=True)
+	for G in automata:
+		G_out.events |= G.events
+		G_out.Euc.update(G.Euc)
+		G_out.Euo.update(G.Euo)
 	G_out.vs[0]['init'] = True
 	return G_out
 
-def weakest_assumption(M,P):
+def weakest_assumption(M,P,staged=False,implicit=False):
 	"""
     Returns the weakest assumption of Machine M and Property P
 
@@ -289,7 +74,12 @@ def weakest_assumption(M,P):
     Parameters:
     M: LTS representing the Machine
 	P: LTS representing the safety property: it must have a single error state name err. Any trace that reaches err violates the property
+	staged: if True, the assumption is computed by parallel_error, backward_error_prop, observer, min_error and complete_automata,
+		building each intermediate LTS. Otherwise it is built in a single pass (see weakest_assumption_fused)
+	implicit: if True, the assumption is completed with an implicit sink (see complete_automata)
     """
+	if not staged:
+		return weakest_assumption_fused(M,P,implicit)
 	comp = parallel_error(M,P)
 	comp.Euo = M.Euo
 	comp = backward_error_prop(comp)
@@ -298,10 +88,163 @@ def weakest_assumption(M,P):
 	for st in comp.vs:
 		if st['name']!='err':
 			st['name'] = str(st.index)
-	weak = complete_automata(comp)
+	weak = complete_automata(comp,implicit)
 	return weak
 
-def complete_automata(A):
+def weakest_assumption_fused(M,P,implicit=False):
+	"""
+    Returns the weakest assumption of Machine M and Property P, built in a single pass.
+
+	The subset construction runs directly on M||P: states of M||P are explored on demand,
+	a state that reaches err with unobservable events of M is replaced by err, and every
+	subset that is marked (holds err) is collapsed into the single err state. The completion
+	sink is added at the end. No intermediate LTS is built.
+	The result is the LTS of weakest_assumption(M,P,staged=True) up to renaming of the states,
+	except for the states that can only be reached through err, which are not built.
+
+    Returns: LTS representing the weakest assumption of M and P
+
+    Parameters:
+    M: LTS representing the Machine
+	P: LTS representing the safety property: it must have a single error state name err. Any trace that reaches err violates the property
+	implicit: if True, the assumption is completed with an implicit sink (see complete_automata)
+    """
+	Euo = frozenset(M.Euo)
+	private_M = M.events - P.events
+	private_P = P.events - M.events
+	# Successors by event of each state of M and P
+	out_M = _completed_out(M)
+	out_P = _completed_out(P)
+	succ_M = [_successors(out_M(st)) for st in range(M.vcount())]
+	succ_P = [_successors(out_P(st)) for st in range(P.vcount())]
+	marked_M = M.vs['marked']
+	marked_P = P.vs['marked']
+	err_P = {st.index for st in P.vs if st['name'] == 'err'}
+	# States of M||P are pairs of state indices; the err state is ERR
+	ERR = 'err'
+	post_memo = dict()
+	def post(st):
+		# Transitions (event, target) of st in M||P, as in parallel_error
+		result = post_memo.get(st)
+		if result is not None:
+			return result
+		(x1,x2) = st
+		out1 = succ_M[x1]
+		out2 = succ_P[x2]
+		result = []
+		for e in out1.keys() | out2.keys():
+			if e in out1 and e in out2:
+				result.extend((e,ERR if t2 in err_P else (t1,t2)) for t1 in out1[e] for t2 in out2[e])
+			elif e in private_M:
+				result.extend((e,(t1,x2)) for t1 in out1[e])
+			elif e in private_P:
+				result.extend((e,ERR if t2 in err_P else (x1,t2)) for t2 in out2[e])
+		post_memo[st] = result
+		return result
+	reach_memo = {ERR: frozenset([ERR])}
+	def reach(st):
+		# Unobservable reach of st in M||P
+		result = reach_memo.get(st)
+		if result is not None:
+			return result
+		seen = {st}
+		stack = [st]
+		while stack:
+			x = stack.pop()
+			if x == ERR:
+				continue
+			for (e,tgt) in post(x):
+				if e in Euo and tgt not in seen:
+					done = reach_memo.get(tgt)
+					if done is not None:
+						seen |= done
+					else:
+						seen.add(tgt)
+						stack.append(tgt)
+		result = reach_memo[st] = frozenset(seen)
+		return result
+	def subset(targets):
+		# Observer state reached by targets. A target that reaches err unobservably is replaced by err (backward_error_prop)
+		S = set()
+		for tgt in targets:
+			R = reach(tgt)
+			if ERR in R:
+				S.add(ERR)
+			else:
+				S |= R
+		return frozenset(S)
+	def marked(S):
+		return ERR in S or any(marked_M[x1] and marked_P[x2] for (x1,x2) in S)
+
+	events = (M.events | P.events) - Euo
+	S0 = subset([(0,0)])
+	states = []
+	edges = []
+	labels = []
+	if not marked(S0):
+		index = {S0: 0}
+		states.append(S0)
+		queue = deque([S0])
+		while queue:
+			S = queue.popleft()
+			src = index[S]
+			adj = dict()
+			for st in S:
+				for (e,tgt) in post(st):
+					if e not in Euo:
+						adj.setdefault(e,[]).append(tgt)
+			for (e,targets) in adj.items():
+				N = subset(targets)
+				if marked(N):
+					# Marked subsets are collapsed into err (min_error), its index is set below
+					tgt = None
+				else:
+					tgt = index.get(N)
+					if tgt is None:
+						tgt = index[N] = len(states)
+						states.append(N)
+						queue.append(N)
+				edges.append((src,tgt))
+				labels.append(e)
+	# If the initial subset is marked, every state is deleted by min_error and only the sink is left
+	n = len(states)
+	err = n
+	sink = n+1 if n else 0
+	enabled = [set() for i in range(n)]
+	for i,(src,tgt) in enumerate(edges):
+		enabled[src].add(labels[i])
+		if tgt is None:
+			edges[i] = (src,err)
+	# Completion (complete_automata)
+	if not implicit:
+		for st in range(n):
+			for e in events.difference(enabled[st]):
+				edges.append((st,sink))
+				labels.append(e)
+		for e in events:
+			edges.append((sink,sink))
+			labels.append(e)
+	weak = d.NFA()
+	if n:
+		weak.add_vertices(n+2,[str(i) for i in range(n)]+['err',str(n+1)],[False]*n+[1,0])
+	else:
+		weak.add_vertices(1,['0'],[0])
+	if implicit:
+		weak.vs['sink'] = [st == sink for st in range(weak.vcount())]
+	weak.vs['init'] = [st == 0 for st in range(weak.vcount())]
+	weak.add_edges(edges,labels,fill_out=True)
+	weak.events = set(events)
+	weak.Euc = (M.Euc | P.Euc) - Euo
+	return weak
+
+def _successors(out):
+	# Targets by event of an out list
+	succ = dict()
+	for (tgt,e) in out:
+		succ.setdefault(e,[]).append(tgt)
+	return succ
+
+def complete_automata(A,implicit=False):
 	"""
     Returns a complete LTS A. An LTS with all transitions. 
 	A new sink state is added to A where missing transitions are directed to this new state
@@ -310,7 +253,13 @@ def complete_automata(A):
 
     Parameters:
     A: LTS to be completed
+    implicit: if True, the transitions to the sink are not added: the sink is flagged with the
+    	'sink' state attribute, and parallel, duplicate_events and ProductView follow its transitions
+    	as if they were stored (see completion_sink)
     """
+	if implicit:
+		A.add_vertex(str(len(A.vs)),0,sink=True)
+		return A
 	transitions = []
 	labels = []
 	for st in A.vs:
@@ -326,6 +275,72 @@ def complete_automata(A):
 	A.add_edges(transitions,labels)
 	return A
 
+def completion_sink(A):
+	"""
+    Returns the index of the implicit completion sink of A, or None if A has no implicit sink.
+	Every state of A other than err and the sink goes to the sink with the events of A it does not enable,
+	and the sink has a self-loop with every event of A. These transitions are not stored in A.
+
+    Returns: state index or None
+
+    Parameters:
+    A: LTS
+    """
+	if 'sink' not in A.vs.attributes():
+		return None
+	for (st,flag) in enumerate(A.vs['sink']):
+		if flag:
+			return st
+	return None
+
+def expand_completion(A):
+	"""
+    Returns A with the transitions to its implicit completion sink stored, as complete_automata(A) would add them
+
+    Returns: LTS A
+
+    Parameters:
+    A: LTS
+    """
+	missing = _completion(A)
+	if missing is None:
+		return A
+	transitions = []
+	labels = []
+	for st in range(A.vcount()):
+		for (tgt,ev) in missing(st):
+			transitions.append((st,tgt))
+			labels.append(ev)
+	del A.vs['sink']
+	A.add_edges(transitions,labels)
+	return A
+
+def _completion(A):
+	# Function returning the transitions of a state of A to the implicit completion sink, or None if A has no implicit sink
+	sink = completion_sink(A)
+	if sink is None:
+		return None
+	names = A.vs['name']
+	outs = A.vs['out']
+	events = A.events
+	loops = [(sink,e) for e in events]
+	def missing(st):
+		if st == sink:
+			return loops
+		if names[st] == 'err':
+			return []
+		enabled = {ev for (tgt,ev) in outs[st]}
+		return [(sink,e) for e in events if e not in enabled]
+	return missing
+
+def _completed_out(A):
+	# Function returning the out list of a state of A, with the transitions to the implicit completion sink
+	outs = A.vs['out']
+	missing = _completion(A)
+	if missing is None:
+		return outs.__getitem__
+	return lambda st: outs[st]+missing(st)
+
 
 def min_error(A):
 	"""
@@ -352,6 +367,49 @@ def min_error(A):
 	A.delete_vertices(error_states)
 	# print(d.DFA(A))
 	return A
+def backward_closure(A,states,events):
+	"""
+    Returns the states of A that reach a state in states with transitions labelled by events (states included).
+	It is a worklist search over the predecessor index of A, linear in the number of states and transitions of A.
+
+    Returns: bytearray, mask over the state indices of A
+
+    Parameters:
+    A: LTS
+    states: iterable of state indices of A
+    events: set of events (e.g. A.Euo or A.Euc)
+    """
+	n = A.vcount()
+	pred = A.predecessor_index(events)
+	mask = bytearray(n)
+	to_visit = []
+	for st in states:
+		if not mask[st]:
+			mask[st] = 1
+			to_visit.append(st)
+	while to_visit:
+		st = to_visit.pop()
+		for (src,ev) in pred[st]:
+			if not mask[src]:
+				mask[src] = 1
+				to_visit.append(src)
+	return mask
+
+def backward_error(A):
+	"""
+    Returns LTS where the err states become unreachable.
+	The states that reach an err state with uncontrollable events are deleted
+
+    Returns: LTS with unreachable err state
+
+    Parameters:
+    A: LTS with err state
+    """
+	error_states = [st.index for st in A.vs if 'err' in st['name']]
+	mask = backward_closure(A,error_states,A.Euc)
+	A.delete_vertices([st for st in range(len(mask)) if mask[st]])
+	return A
+
 def backward_error_prop(A):
 	"""
     Returns LTS where the err state becomes unreachable
@@ -363,28 +421,18 @@ def backward_error_prop(A):
     """
 	error_states = [st.index for st in A.vs if 'err'==st['name']]
 	error_state = error_states[0]
-	transitions_to_del = []
-	transitions = []
-	transitions_to_add = []
-	check = True
-	while check:
-		check = False
-		for st in A.vs:
-			if st.index not in error_states:
-				for (tgt, ev) in st['out']:
-					if tgt in error_states and ev in A.Euo:
-						error_states.append(st.index)
-						check=True
-	error_states.pop(0)
-	l = A.es.select(_target_in=error_states)
+	# States that reach err with unobservable events are merged into err
+	mask = backward_closure(A,error_states,A.Euo)
+	mask[error_state] = 0
 	transitions_to_add = []
 	labels = []
-	for edge in l:
-		# print(edge.source)
-		transitions_to_add.append((edge.source,error_state))
-		labels.append(edge["label"])
+	for (src,out) in enumerate(A.vs['out']):
+		for (tgt,ev) in out:
+			if mask[tgt]:
+				transitions_to_add.append((src,error_state))
+				labels.append(ev)
 	A.add_edges(transitions_to_add,labels)
-	A.delete_vertices(error_states)
+	A.delete_vertices([st for st in range(len(mask)) if mask[st]])
 	return A
 def duplicate_events(A):
 	"""
@@ -405,6 +453,9 @@ def duplicate_events(A):
 				transitions.append((st.index,dst))
 				labels.append(d.Event(ev.label+'_n'))
 	A.add_edges(transitions,labels)
+	if completion_sink(A) is not None:
+		# The implicit sink also completes the duplicated events
+		A.events.update(d.Event(ev.label+'_n') for ev in C)
 	A.Euc = C
 	return A
 
@@ -419,43 +470,33 @@ def remove_duplicate_events(A):
 def Compute_pre_and_uctr(A):
 	"""
     Returns LTS A with parameters uncontrollable states and predecessors
+	Both are read from the predecessor index of A, in time linear in the states and transitions of A
     Returns: LTS A
 
     Parameters:
     A: LTS to add new paramenters
     """
-	visited = []
-	to_visit = []
-	pre = [[] for i in range(len(A.vs))]
-	unctr = [[] for i in range(len(A.vs))]
-	constraints = [set() for i in range(len(A.vs))]
-	to_visit.append(0)
+	n = A.vcount()
+	# States reachable from the initial state
+	visited = bytearray(n)
+	to_visit = deque()
+	if n:
+		visited[0] = 1
+		to_visit.append(0)
+	outs = A.vs['out']
 	while to_visit:
-		st = to_visit.pop(0)
-		visited.append(st)
-		for (tgt, ev) in A.vs[st]['out']:
-			if tgt not in visited and tgt not in to_visit:
+		st = to_visit.popleft()
+		for (tgt, ev) in outs[st]:
+			if not visited[tgt]:
+				visited[tgt] = 1
 				to_visit.append(tgt)
-			if (st,ev) not in pre[tgt]:
-				pre[tgt].append((st,ev))
-			if ev in A.Euc:
-				unctr[tgt].append(st)
-			# else:
-			# 	env_src = A.vs[st]['name'][0]
-			# 	if "err" in A.vs[tgt]['name']:
-			# 		env_tgt = A.vs[tgt]['name'][0]
-			# 		if (env_src,ev,env_tgt) not in constraints[tgt]:
-			# 			constraints[tgt].add((env_src,ev,env_tgt))
-			# 	else:
-			# 		for j in range(n):
-			# 			if (env_src,ev,str(j)) not in constraints[tgt]:
-			# 				constraints[tgt].add((env_src,ev,str(j)))
-
+	# Predecessors of each state from the reachable states, without repeated (source, event) pairs
+	pre = [list(dict.fromkeys((src,ev) for (src,ev) in preds if visited[src])) for preds in A.predecessor_index()]
+	unctr = [[src for (src,ev) in preds if visited[src]] for preds in A.predecessor_index(A.Euc)]
 	A.vs["pre"] = pre
 	A.vs["uctr"] = unctr
-	# A.vs["constraints"] = constraints
 
-def backward_errors(A):
+def backward_errors(A,exhaustive=False,stats=None,workers=None):
 	"""
     Returns a list of set of transitions to be deleted from the Env_duplicated
 
@@ -463,20 +504,36 @@ def backward_errors(A):
 
     Parameters:
     A: LTS of Env_duplicated composed with the Weakest assumption 
+    exhaustive: if False, only the minimal sets are returned, computed by minimal_cuts.
+    	If True, every combination of predecessor states is tested (power set search) and the sets that
+    	are not minimal are discarded as they are found
+    stats: optional dict where the number of candidates and duplicates skipped are stored
+    workers: number of processes evaluating the candidate sets of the exhaustive search (None or 1 evaluates in this process).
+    	The result is the same, in the same order, for any number of workers
     """
+	if stats is None:
+		stats = dict()
+	if not exhaustive:
+		return list(minimal_cuts(A,stats))
 	# Getting the error states in A = Env_f||Weakest
-	error_states = set([st.index for st in A.vs if 'err'in st['name']])
+	error_states = frozenset([st.index for st in A.vs if 'err'in st['name']])
 	#total_list_unreach holds the values of all possible set of unreachable states we must test to check the perturbation set
 	total_list_unreach = []
 	#list_unreach is a list of states we want to make unreachable. It starts with just the error states.
 	#Note that the lists of unreachable states in list unreach might not be the same as the ones in total_list_unreach
 	#We expand the set of unreachable states in list unreach to include the states that uncontrollably reach a states in list unreach 
 	#For example, if state 1 reaches the err state via uncontrollable event b, then 1 must be included in the total list of unreach
-	list_unreach = [list(error_states)]
+	list_unreach = deque([error_states])
+	#Sets of states are kept as frozensets. queued holds the sets added to list_unreach and expanded the sets after expansion
+	queued = {error_states}
+	expanded = set()
+	stats["candidates"] = 1
+	stats["duplicate_candidates"] = 0
+	stats["duplicate_unreach"] = 0
 	
 	while list_unreach:
 		
-		unvisited = list_unreach.pop(0)
+		unvisited = list(list_unreach.popleft())
 		unreach = set(unvisited)
 		while unvisited:
 			st = unvisited.pop(0)
@@ -485,57 +542,404 @@ def backward_errors(A):
 				if new_st not in unvisited and new_st not in unreach:
 					unreach.add(new_st)
 					unvisited.append(new_st)
+		unreach = frozenset(unreach)
+		#Different candidates can expand to the same set, its successors have already been generated
+		if unreach in expanded:
+			stats["duplicate_unreach"] += 1
+			continue
+		expanded.add(unreach)
 		#If the initial state was not added to unreach then we go to the next iteration, 
 		#because we cannot make the initial state unreachable
 		if 0 not in unreach:
 			#Add the expanded list unreach to the total_list_unreach. Note that unreach \superseteq unvisited (before any pop)
-			if unreach not in total_list_unreach:
-				total_list_unreach.append(list(unreach))
+			total_list_unreach.append(unreach)
 			#Based on states in unreach, we do a one step predecessor
 			#The idea is to replace a state in unreach making predecessors unreachable
 			new_states = {src for st in unreach for (src, ev) in A.vs[st]['pre'] if (src not in unreach and src!=0)}
 			#All possible combinations
 			#Here we might be able to do better. For now, we try all possible combinations
-			new_state_combinations= [set(t) for i in range(1,len(new_states)+1) for t in combinations(new_states, i)]
 			#We take the union of the current unreach with every possible combination
-			new_unreach = [list(t.union(unreach)) for t in new_state_combinations if list(t.union(unreach)) not in total_list_unreach] 
 			# These are added to the list_unreach as possible states to make unreachable next
-			if new_unreach:
-				list_unreach.extend(new_unreach)
-	#Set with all possible transition removals
-	list_constraints = []
-	for unr in total_list_unreach:
-		# Copies the LTS
-		Atrim = A.copy()
-		# We delete the states in unr
-		Atrim.delete_vertices(unr)
-		# Delete any other unreachable state after deleting unr
-		d.unary.trim(Atrim)
-		# Set where we store the transitions to be deleted in this iteration
-		constraints = set()
-		for st in Atrim.vs:
-			# Check comparing A and A trim based on their name and not index
-			env_st = st["name"][0]
-			# Find the same state in the not trimmed LTS
-			st_A = A.vs.select(name=st["name"])
-			st_A = st_A[0]
-			# Get the list of successors for states st and st_A
-			# We will compare what has been delete in the list of successors of st
-			# after we deleted unr. 
-			out_stA = [(A.vs[tgt]["name"], e) for (tgt,e) in st_A["out"]]
-			out_st = [(Atrim.vs[tgt]["name"], e) for (tgt,e) in st["out"]]
-			for (tgt,e) in out_stA:
-				# When a transition is in the successors of st_A 
-				# but not in the successors of st, it implies that a transition has been deleted
-				# as to make a state in unr unreachable. We add the constraint of this transition
-				# removal to contraints.
-				if (tgt, e) not in out_st:
-					if (st["name"][0],e,tgt[0]) not in constraints:
-						constraints.add((st["name"][0],e,tgt[0]))
-		# if the constraints have not been added yet. Add them to the list of constraints.
-		if constraints not in list_constraints:
-			list_constraints.append(constraints)
-	return list_constraints
+			for i in range(1,len(new_states)+1):
+				for t in combinations(new_states, i):
+					new_unreach = unreach.union(t)
+					if new_unreach in queued:
+						stats["duplicate_candidates"] += 1
+						continue
+					queued.add(new_unreach)
+					list_unreach.append(new_unreach)
+					stats["candidates"] += 1
+	#Minimal sets of transition removals, non-minimal sets are discarded as they are found
+	list_constraints = Antichain()
+	#Bitmasks of the sets of transition removals already tested
+	seen_constraints = set()
+	stats["duplicate_constraints"] = 0
+	if workers is not None and workers > 1:
+		masks = _removal_masks_shared(A,total_list_unreach,list_constraints,workers)
+	else:
+		out = A.vs['out']
+		names = A.vs['name']
+		# Transitions deleted when the states in unr are removed (and the states that become unreachable)
+		masks = (list_constraints.encode(removal_constraints(A,unr,out,names)) for unr in total_list_unreach)
+	# Masks are received in the order of total_list_unreach
+	for mask in masks:
+		# Add the constraints unless they contain constraints already found. Constraints containing them are removed.
+		if mask in seen_constraints:
+			stats["duplicate_constraints"] += 1
+			continue
+		seen_constraints.add(mask)
+		list_constraints.add_mask(mask)
+	stats["unreach"] = len(total_list_unreach)
+	return list_constraints.sets()
+
+def removal_constraints(A,unreach,out=None,names=None):
+	"""
+    Returns the transitions to be deleted from the Env_duplicated to make the states in unreach unreachable.
+	These are the transitions from the states still reachable once unreach is removed to states in unreach.
+	A is not modified or copied: reachability is computed on A with unreach masked out,
+	and transitions are compared by state index.
+
+    Returns: set of transitions
+
+    Parameters:
+    A: LTS of Env_duplicated composed with the Weakest assumption
+    unreach: iterable of state indices of A to make unreachable
+    out, names: optional A.vs['out'] and A.vs['name'], when they are reused across calls
+    """
+	if out is None:
+		out = A.vs['out']
+	if names is None:
+		names = A.vs['name']
+	removed = bytearray(len(out))
+	for st in unreach:
+		removed[st] = 1
+	constraints = set()
+	if removed[0]:
+		return constraints
+	visited = bytearray(len(out))
+	visited[0] = 1
+	to_visit = [0]
+	while to_visit:
+		st = to_visit.pop()
+		for (tgt,e) in out[st]:
+			if removed[tgt]:
+				constraints.add((names[st][0],e,names[tgt][0]))
+			elif not visited[tgt]:
+				visited[tgt] = 1
+				to_visit.append(tgt)
+	return constraints
+
+# Arrays of the composed LTS shared with the worker processes of backward_errors
+_shared = dict()
+
+def _attach(name,n,m):
+	shm = shared_memory.SharedMemory(name=name)
+	data = shm.buf.cast('q')
+	_shared['shm'] = shm
+	_shared['offsets'] = data[0:n+1]
+	_shared['targets'] = data[n+1:n+1+m]
+	_shared['ids'] = data[n+1+m:n+1+2*m]
+
+def _removal_mask(unreach):
+	# Same as removal_constraints, on the shared arrays. Transitions are returned as a bitmask of their ids
+	offsets = _shared['offsets']
+	targets = _shared['targets']
+	ids = _shared['ids']
+	removed = bytearray(len(offsets)-1)
+	for st in unreach:
+		removed[st] = 1
+	mask = 0
+	if removed[0]:
+		return mask
+	visited = bytearray(len(removed))
+	visited[0] = 1
+	to_visit = [0]
+	while to_visit:
+		st = to_visit.pop()
+		for k in range(offsets[st],offsets[st+1]):
+			tgt = targets[k]
+			if removed[tgt]:
+				mask |= 1 << ids[k]
+			elif not visited[tgt]:
+				visited[tgt] = 1
+				to_visit.append(tgt)
+	return mask
+
+def _removal_masks_shared(A,candidates,chain,workers):
+	"""
+	Yields removal_constraints(A,unr) for every unr in candidates, in order, as bitmasks of chain.
+	The transitions of A are stored once in shared memory (offsets, targets and transition ids per state)
+	and read by a pool of workers processes.
+	"""
+	out = A.vs['out']
+	names = A.vs['name']
+	n = len(out)
+	offsets = array('q',[0])
+	targets = array('q')
+	ids = array('q')
+	for st in range(n):
+		for (tgt,e) in out[st]:
+			targets.append(tgt)
+			ids.append(chain.bit((names[st][0],e,names[tgt][0])).bit_length()-1)
+		offsets.append(len(targets))
+	m = len(targets)
+	shm = shared_memory.SharedMemory(create=True,size=8*(n+1+2*m))
+	try:
+		data = shm.buf.cast('q')
+		data[0:n+1] = offsets
+		data[n+1:n+1+m] = targets
+		data[n+1+m:n+1+2*m] = ids
+		data.release()
+		chunksize = max(1,len(candidates)//(4*workers))
+		with multiprocessing.Pool(workers,initializer=_attach,initargs=(shm.name,n,m)) as pool:
+			for mask in pool.imap(_removal_mask,[tuple(unr) for unr in candidates],chunksize):
+				yield mask
+	finally:
+		shm.close()
+		shm.unlink()
+
+def minimal_cuts(A,stats=None,deadline=None):
+	"""
+    Yields the minimal sets of transitions to be deleted from the Env_duplicated, by increasing size.
+	Each set is yielded as soon as it is known to be minimal.
+
+	A set of states U to make unreachable contains the error states, no initial state, and every state
+	that reaches U uncontrollably. Its transitions to delete are the ones from outside U into U.
+	The search grows U backwards from the error states: each predecessor of U is either added to U
+	or kept out of U (its transitions into U are deleted). Partial solutions are expanded by
+	increasing number of deleted transitions, and the ones that contain a solution already found are pruned.
+	Unlike backward_errors(A,exhaustive=True), the power set of the predecessors is never built.
+
+    Returns: generator of sets of transitions
+
+    Parameters:
+    A: LTS of Env_duplicated composed with the Weakest assumption, with the pre and uctr
+    	attributes of Compute_pre_and_uctr, or a ProductView of Env_duplicated and the Weakest assumption
+    stats: optional dict where the number of partial solutions expanded and pruned are stored,
+    	and "exhaustive": True once every minimal set has been yielded
+    deadline: optional time.perf_counter() value after which the search stops (with stats["exhaustive"] False)
+    """
+	if stats is None:
+		stats = dict()
+	stats["expanded"] = 0
+	stats["pruned"] = 0
+	stats["exhaustive"] = False
+	if isinstance(A,ProductView):
+		(names,pre,uctr,out) = (A.names,A.pre,A.uctr,A.out)
+		error_states = A.error_states
+	else:
+		names = A.vs['name']
+		pre = A.vs['pre']
+		uctr = A.vs['uctr']
+		out = A.vs['out']
+		error_states = [st.index for st in A.vs if 'err' in st['name']]
+	# Minimal sets found so far. A set of transitions is encoded as an integer bitmask
+	found = Antichain()
+	def bit(src,ev,tgt):
+		return found.bit((names[src][0],ev,names[tgt][0]))
+
+	# Adds st and the states that reach it uncontrollably to U
+	# It returns the new U, the states added and the predecessors of the states added, or None if the initial state or an excluded state is added
+	def close(st,U,excluded):
+		added = []
+		preds = 0
+		stack = [st]
+		U |= 1 << st
+		while stack:
+			st = stack.pop()
+			if st == 0 or excluded >> st & 1:
+				return None
+			added.append(st)
+			for (src,ev) in pre[st]:
+				preds |= 1 << src
+			for src in uctr[st]:
+				if not U >> src & 1:
+					U |= 1 << src
+					stack.append(src)
+		return (U,added,preds)
+
+	U = 0
+	frontier = 0
+	for st in error_states:
+		if U >> st & 1:
+			continue
+		closed = close(st,U,0)
+		if closed is None:
+			stats["exhaustive"] = True
+			return
+		(U,added,preds) = closed
+		frontier |= preds
+	frontier &= ~U
+	# Queue of partial solutions (number of transitions, order, U, excluded states, frontier, transitions)
+	queue = [(0,0,U,0,frontier,0)]
+	count = 1
+	while queue:
+		if deadline is not None and time.perf_counter() > deadline:
+			return
+		(size,_,U,excluded,frontier,cut) = heappop(queue)
+		if found.has_subset_mask(cut):
+			stats["pruned"] += 1
+			continue
+		stats["expanded"] += 1
+		if not frontier:
+			found.add_mask(cut)
+			yield found.decode(cut)
+			continue
+		st = (frontier & -frontier).bit_length()-1
+		# st is kept out of U: its transitions into U are deleted
+		new_cut = cut
+		for (tgt,ev) in out[st]:
+			if U >> tgt & 1:
+				new_cut |= bit(st,ev,tgt)
+		if not found.has_subset_mask(new_cut):
+			heappush(queue,(bin(new_cut).count("1"),count,U,excluded | 1 << st,frontier & ~(1 << st),new_cut))
+			count += 1
+		else:
+			stats["pruned"] += 1
+		# st is added to U with the states that reach it uncontrollably
+		closed = close(st,U,excluded)
+		if closed is not None:
+			(new_U,added,preds) = closed
+			new_cut = cut
+			for tgt in added:
+				for (src,ev) in pre[tgt]:
+					if excluded >> src & 1:
+						new_cut |= bit(src,ev,tgt)
+			if not found.has_subset_mask(new_cut):
+				heappush(queue,(bin(new_cut).count("1"),count,new_U,excluded,(frontier | preds) & ~new_U & ~excluded,new_cut))
+				count += 1
+			else:
+				stats["pruned"] += 1
+	stats["exhaustive"] = True
+
+class _Lazy:
+	# Sequence whose items are computed on first access
+	def __init__(self,fn):
+		self.fn = fn
+		self.items = dict()
+
+	def __getitem__(self,st):
+		item = self.items.get(st)
+		if item is None:
+			item = self.items[st] = self.fn(st)
+		return item
+
+class ProductView:
+	"""
+	On-demand view of parallel(Env,weak) for minimal_cuts.
+
+	The states of the product are numbered as they are visited, the initial state is 0.
+	The predecessors (pre, uctr) and successors (out) of a state are computed from Env and weak
+	the first time minimal_cuts asks for them, so only the states around the err states
+	explored by the search are built. The error states are the pairs with an err component.
+	Pairs that are not reachable from the initial state can be visited: the states they add to
+	the sets to make unreachable have no transitions from reachable states, so the minimal sets
+	of transitions are the ones of parallel(Env,weak).
+
+	Attributes:
+	names, pre, uctr, out: sequences indexed by state, as the attributes of Compute_pre_and_uctr
+	error_states: list of error states
+	visited: number of product states visited
+
+	Parameters:
+	Env: LTS of the environment
+	weak: LTS of the weakest assumption (with duplicated events)
+	tables: optional tables of Env returned by _tables(Env), to share them between views of the same Env
+	"""
+	def __init__(self,Env,weak,tables=None):
+		self.Env = Env
+		self.weak = weak
+		self.shared = Env.events & weak.events
+		self.private_Env = Env.events - weak.events
+		self.private_weak = weak.events - Env.events
+		self.Euc = Env.Euc | weak.Euc
+		(succ_Env,pred_Env) = _tables(Env) if tables is None else tables
+		(succ_weak,pred_weak) = _tables(weak)
+		self._succ = (succ_Env,succ_weak)
+		self._pred = (pred_Env,pred_weak)
+		self._names = (Env.vs['name'],weak.vs['name'])
+		self._id = dict()
+		self._pairs = []
+		self._index((0,0))
+		self.names = _Lazy(self._name)
+		self.pre = _Lazy(self._pre)
+		self.uctr = _Lazy(self._uctr)
+		self.out = _Lazy(self._out)
+		(names_Env,names_weak) = self._names
+		self.error_states = [self._index((x1,x2)) for x2 in range(len(names_weak)) if names_weak[x2] == 'err' for x1 in range(len(names_Env))]
+		self.error_states.extend(self._index((x1,x2)) for x1 in range(len(names_Env)) if names_Env[x1] == 'err' for x2 in range(len(names_weak)))
+
+	@property
+	def visited(self):
+		return len(self._pairs)
+
+	def _index(self,pair):
+		st = self._id.get(pair)
+		if st is None:
+			st = self._id[pair] = len(self._pairs)
+			self._pairs.append(pair)
+		return st
+
+	def _name(self,st):
+		(x1,x2) = self._pairs[st]
+		return (self._names[0][x1],self._names[1][x2])
+
+	def _pre(self,st):
+		(x1,x2) = self._pairs[st]
+		(pred1,pred2) = (self._pred[0][x1],self._pred[1][x2])
+		pre = dict()
+		for (e,srcs) in pred1.items():
+			if e in self.shared:
+				for src1 in srcs:
+					for src2 in pred2.get(e,()):
+						pre[(self._index((src1,src2)),e)] = None
+			elif e in self.private_Env:
+				for src1 in srcs:
+					pre[(self._index((src1,x2)),e)] = None
+		for (e,srcs) in pred2.items():
+			if e in self.private_weak:
+				for src2 in srcs:
+					pre[(self._index((x1,src2)),e)] = None
+		return list(pre)
+
+	def _uctr(self,st):
+		return [src for (src,e) in self.pre[st] if e in self.Euc]
+
+	def _out(self,st):
+		(x1,x2) = self._pairs[st]
+		(succ1,succ2) = (self._succ[0][x1],self._succ[1][x2])
+		out = []
+		for e in succ1.keys() | succ2.keys():
+			if e in succ1 and e in succ2:
+				out.extend((self._index((tgt1,tgt2)),e) for tgt1 in succ1[e] for tgt2 in succ2[e])
+			elif e in self.private_Env:
+				out.extend((self._index((tgt1,x2)),e) for tgt1 in succ1[e])
+			elif e in self.private_weak:
+				out.extend((self._index((x1,tgt2)),e) for tgt2 in succ2[e])
+		return out
+
+def _tables(A):
+	# Successors and predecessors by event of each state of A, computed on first access
+	out = _completed_out(A)
+	return (_Lazy(lambda st: _successors(out(st))),_predecessors(A))
+
+def _predecessors(A):
+	# Sources by event of each state of A. The predecessors of the implicit completion sink are computed on first access
+	pred = [dict() for i in range(A.vcount())]
+	for (tgt,preds) in enumerate(A.predecessor_index()):
+		for (src,e) in preds:
+			pred[tgt].setdefault(e,[]).append(src)
+	missing = _completion(A)
+	if missing is None:
+		return pred
+	sink = completion_sink(A)
+	def completed(st):
+		if st == sink:
+			for src in range(A.vcount()):
+				for (tgt,e) in missing(src):
+					pred[sink].setdefault(e,[]).append(src)
+		return pred[st]
+	return _Lazy(completed)
 
 def Extract_Minimal(trans2del):
 	"""
@@ -546,19 +950,148 @@ def Extract_Minimal(trans2del):
     Parameters:
     trans2del: A list containing sets of transitions to be deleted from the full environment
     """
-	for trans in trans2del:
-		for compare in trans2del:
-			if trans.issuperset(compare) and compare!=trans:
-				trans2del.remove(trans)
-				break
-	return trans2del
+	return Antichain(trans2del).sets()
 
-def tolerance_safety(Env,Ctr,Prop):
-	weak = weakest_assumption(Ctr,Prop)
-	weak = duplicate_events(weak)
-	comp = parallel(Env,weak)
-	Compute_pre_and_uctr(comp)
-	trans2del = backward_errors(comp)
-	trans2del= Extract_Minimal(trans2del)
+def tolerance_safety(Env,Ctr,Prop,profile=None,exhaustive=False,workers=None,lazy=True,cache=None):
+	"""
+	Returns the minimal sets of transitions of Env whose removal makes Env || Ctr satisfy Prop
+
+	Returns: list(set of transitions)
+
+	Parameters:
+	Env, Ctr, Prop: LTS of the environment, the controller and the safety property
+	profile: optional tol_profile.Profile recording time, memory and counts of each phase
+	exhaustive, workers: see backward_errors
+	lazy: if True (and exhaustive is False), the product of Env and the weakest assumption is not built:
+		minimal_cuts explores a ProductView. The profile reports the product states visited
+		and the number of pairs of states of Env and the weakest assumption
+	cache: optional tol_cache.AssumptionCache. The weakest assumption (with duplicated events)
+		of (Ctr, Prop) is loaded from it, or computed and stored in it
+	"""
+	weak = _assumption(Ctr,Prop,profile,cache)
+	if lazy and not exhaustive:
+		with phase(profile,"minimal_cuts") as counts:
+			comp = ProductView(Env,weak)
+			trans2del = list(minimal_cuts(comp,counts))
+			counts["visited"] = comp.visited
+			counts["pairs"] = Env.vcount()*weak.vcount()
+			counts["sets"] = len(trans2del)
+		return trans2del
+	with phase(profile,"parallel") as counts:
+		comp = parallel(Env,weak)
+		counts["states"] = comp.vcount()
+		counts["edges"] = comp.ecount()
+	with phase(profile,"Compute_pre_and_uctr"):
+		Compute_pre_and_uctr(comp)
+	with phase(profile,"backward_errors") as counts:
+		trans2del = backward_errors(comp,exhaustive,counts,workers)
+		counts["sets"] = len(trans2del)
+	with phase(profile,"Extract_Minimal") as counts:
+		trans2del= Extract_Minimal(trans2del)
+		counts["minimal"] = len(trans2del)
 	return trans2del
-	
\ No newline at end of file
+
+def tolerance_safety_iter(Env,Ctr,Prop,stats=None,deadline=None,cache=None):
+	"""
+	Yields the minimal sets of transitions of Env whose removal makes Env || Ctr satisfy Prop,
+	by increasing size, each one as soon as it is certified minimal.
+
+	Returns: generator of sets of transitions
+
+	Parameters:
+	Env, Ctr, Prop: LTS of the environment, the controller and the safety property
+	stats: optional dict filled by minimal_cuts. stats["exhaustive"] is True once every set has been yielded
+	deadline: optional time.perf_counter() value after which no more sets are searched
+	cache: optional tol_cache.AssumptionCache (see tolerance_safety)
+	"""
+	weak = _assumption(Ctr,Prop,None,cache)
+	yield from minimal_cuts(ProductView(Env,weak),stats,deadline)
+
+def tolerance_safety_anytime(Env,Ctr,Prop,budget=None,max_results=None,callback=None,profile=None,cache=None):
+	"""
+	Anytime version of tolerance_safety: the search stops after budget seconds or max_results sets,
+	and the sets found until then are returned. They are minimal, and they are the smallest ones
+	(the sets are found by increasing size).
+
+	Returns: (list(set of transitions), exhaustive), where exhaustive is True if the list has every minimal set
+
+	Parameters:
+	Env, Ctr, Prop: LTS of the environment, the controller and the safety property
+	budget: optional wall-clock budget in seconds, including the construction of the weakest assumption
+	max_results: optional maximum number of sets
+	callback: optional function called with each set when it is found
+	profile: optional tol_profile.Profile
+	cache: optional tol_cache.AssumptionCache (see tolerance_safety)
+	"""
+	deadline = None if budget is None else time.perf_counter()+budget
+	weak = _assumption(Ctr,Prop,profile,cache)
+	trans2del = []
+	with phase(profile,"minimal_cuts") as counts:
+		comp = ProductView(Env,weak)
+		if max_results is None or max_results > 0:
+			for trans in minimal_cuts(comp,counts,deadline):
+				trans2del.append(trans)
+				if callback is not None:
+					callback(trans)
+				if max_results is not None and len(trans2del) >= max_results:
+					break
+		counts["visited"] = comp.visited
+		counts["sets"] = len(trans2del)
+	return (trans2del,counts.get("exhaustive",False))
+
+def tolerance_safety_multi(Env,Ctr,Props,profile=None,cache=None):
+	"""
+	Returns the minimal sets of transitions of Env whose removal makes Env || Ctr satisfy each property of Props,
+	and the minimal sets whose removal makes Env || Ctr satisfy all of them.
+
+	The tables of Env (successors and predecessors by event) are built once and shared by the products
+	with the weakest assumptions of the properties. Removing more transitions keeps a safety property
+	satisfied, so a set satisfies all the properties iff it contains a minimal set of each property:
+	the sets for all the properties are the minimal unions of one minimal set per property.
+
+	Returns: (per_property, common)
+		per_property: list(list(set of transitions)), the minimal sets of each property, in the order of Props
+		common: list(set of transitions), the minimal sets for all the properties
+
+	Parameters:
+	Env, Ctr: LTS of the environment and the controller
+	Props: list of LTS of the safety properties
+	profile: optional tol_profile.Profile
+	cache: optional tol_cache.AssumptionCache (see tolerance_safety)
+	"""
+	tables = _tables(Env)
+	per_property = []
+	for (i,Prop) in enumerate(Props):
+		weak = _assumption(Ctr,Prop,profile,cache)
+		with phase(profile,"minimal_cuts",property=i) as counts:
+			comp = ProductView(Env,weak,tables)
+			trans2del = list(minimal_cuts(comp,counts))
+			counts["visited"] = comp.visited
+			counts["sets"] = len(trans2del)
+		per_property.append(trans2del)
+	with phase(profile,"intersection") as counts:
+		common = [set()]
+		for trans2del in per_property:
+			common = Antichain(s1 | s2 for s1 in common for s2 in trans2del).sets()
+		counts["sets"] = len(common)
+	return (per_property,common)
+
+def _assumption(Ctr,Prop,profile=None,cache=None):
+	# Weakest assumption of (Ctr, Prop) with duplicated events, from the cache if given
+	weak = None
+	if cache is not None:
+		with phase(profile,"cache_load") as counts:
+			weak = cache.load(Ctr,Prop)
+			counts["hit"] = weak is not None
+	if weak is None:
+		with phase(profile,"weakest_assumption") as counts:
+			weak = weakest_assumption(Ctr,Prop,implicit=True)
+			counts["states"] = weak.vcount()
+			counts["edges"] = weak.ecount()
+		with phase(profile,"duplicate_events") as counts:
+			weak = duplicate_events(weak)
+			counts["edges"] = weak.ecount()
+		if cache is not None:
+			with phase(profile,"cache_store"):
+				cache.store(Ctr,Prop,weak)
+	return weak